@@ -0,0 +1,53 @@
+import gzip
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время ответа и размер JSON API '
+            'с аналогичными HTML-страницами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+
+    def measure(self, client, url, requests):
+        elapsed = 0.0
+        for _ in range(requests):
+            cache.clear()
+            start = time.perf_counter()
+            response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            elapsed += time.perf_counter() - start
+        content = response.content
+        if response.get('Content-Encoding') == 'gzip':
+            raw = len(gzip.decompress(content))
+        else:
+            raw = len(content)
+        return elapsed / requests * 1000, raw, len(content)
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related('group').first()
+        if post is None:
+            raise CommandError('Нет постов для замера.')
+        pairs = [
+            ('лента', '/', '/api/v1/posts/?limit=10'),
+            ('пост', f'/posts/{post.pk}/', f'/api/v1/posts/{post.pk}/'),
+        ]
+        if post.group:
+            slug = post.group.slug
+            pairs.append((
+                'группа', f'/group/{slug}/',
+                f'/api/v1/posts/?group={slug}&limit=10',
+            ))
+        client = Client()
+        for label, html_url, api_url in pairs:
+            for kind, url in (('HTML', html_url), ('API', api_url)):
+                latency, raw, sent = self.measure(
+                    client, url, options['requests'])
+                self.stdout.write(
+                    f'{label:6} {kind:4} {latency:7.2f} мс  '
+                    f'{raw:7} байт, передано {sent:7} байт  {url}')
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import uploads
+from api.models import Upload
+
+
+class Command(BaseCommand):
+    help = 'Удаляет брошенные загрузки по частям вместе с их файлами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=int, default=settings.UPLOAD_EXPIRY,
+            help='Сколько секунд без новых частей загрузка считается живой.')
+
+    def handle(self, *args, **options):
+        deadline = timezone.now() - timedelta(seconds=options['max_age'])
+        removed = 0
+        for upload in Upload.objects.filter(updated__lt=deadline).iterator():
+            uploads.remove(upload)
+            upload.delete()
+            removed += 1
+        self.stdout.write(self.style.SUCCESS(f'Удалено загрузок: {removed}.'))
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('size', models.BigIntegerField(verbose_name='Размер')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='Принято байт')),
+                ('sha256', models.CharField(max_length=64, verbose_name='Контрольная сумма SHA-256')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Начата')),
+                ('updated', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Обновлена')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to=settings.AUTH_USER_MODEL, verbose_name='Владелец')),
+            ],
+            options={
+                'verbose_name': 'Загрузка',
+                'verbose_name_plural': 'Загрузки',
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+import hashlib
+import secrets
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+class Upload(models.Model):
+    """Загрузка файла по частям, которую можно продолжить после обрыва."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4,
+                          editable=False)
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='uploads',
+        verbose_name='Владелец',
+    )
+    filename = models.CharField('Имя файла', max_length=255)
+    size = models.BigIntegerField('Размер')
+    offset = models.BigIntegerField('Принято байт', default=0)
+    sha256 = models.CharField('Контрольная сумма SHA-256', max_length=64)
+    created = models.DateTimeField('Начата', auto_now_add=True)
+    updated = models.DateTimeField('Обновлена', auto_now=True,
+                                   db_index=True)
+
+    class Meta:
+        verbose_name = 'Загрузка'
+        verbose_name_plural = 'Загрузки'
+
+
+class Token(models.Model):
+    """Ключ доступа к API для клиентов без cookie сессии.
+
+    Хранится только SHA-256 ключа, сам ключ выдаётся один раз.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='api_token',
+        verbose_name='Пользователь',
+    )
+    digest = models.CharField('SHA-256 ключа', max_length=64, unique=True)
+    created = models.DateTimeField('Выдан', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Ключ API'
+        verbose_name_plural = 'Ключи API'
+
+    @staticmethod
+    def hash(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user):
+        """Выдаёт пользователю новый ключ, прежний перестаёт действовать."""
+        key = secrets.token_hex(20)
+        cls.objects.update_or_create(
+            user=user, defaults={'digest': cls.hash(key)})
+        return key
@@ -0,0 +1,240 @@
+import base64
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from api.models import Upload
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='api_user')
+        cls.other = User.objects.create_user(username='api_other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='api-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {i}', group=cls.group)
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def send(self, client, method, url, data):
+        return getattr(client, method)(
+            url, data=json.dumps(data), content_type='application/json')
+
+    def test_post_list_cursor_pagination(self):
+        """Курсор обходит все посты без повторов и пропусков."""
+        url = reverse('api:post_list') + '?limit=2'
+        seen = []
+        while url:
+            data = self.guest_client.get(url).json()
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        self.assertEqual(seen, [post.id for post in reversed(self.posts)])
+
+    def test_cursor_with_bad_values_is_rejected(self):
+        """Курсор правильной формы с негодными значениями — это 400."""
+        for values in (['вчера', 1], ['2020-01-01T00:00:00', 'один'],
+                       [None, 1], [[], {}]):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(values).encode()).decode()
+            response = self.guest_client.get(
+                reverse('api:post_list'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, values)
+
+    def test_session_write_without_csrf_token_is_json_403(self):
+        """Запись по cookie сессии без CSRF-токена отклоняется JSON-ом."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        count = Post.objects.count()
+        response = self.send(
+            client, 'post', reverse('api:post_list'), {'text': 'Без токена'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(Post.objects.count(), count)
+
+    def test_token_login_works_without_cookies_and_csrf(self):
+        """Клиент без cookie входит ключом API и пишет без CSRF."""
+        self.user.set_password('secret-password')
+        self.user.save()
+        client = Client(enforce_csrf_checks=True)
+        response = self.send(client, 'post', reverse('api:token'), {
+            'username': 'api_user', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+        response = self.send(client, 'post', reverse('api:token'), {
+            'username': 'api_user', 'password': 'secret-password'})
+        self.assertEqual(response.status_code, 201)
+        key = response.json()['token']
+        response = client.post(
+            reverse('api:post_list'), data=json.dumps({'text': 'С ключом'}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'api_user')
+        response = client.post(
+            reverse('api:post_list'), data=json.dumps({'text': 'Чужой'}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION='Token неверный')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def test_field_selection(self):
+        """Параметр fields ограничивает поля ответа."""
+        response = self.guest_client.get(
+            reverse('api:post_list') + '?fields=id,author')
+        item = response.json()['results'][0]
+        self.assertEqual(set(item), {'id', 'author'})
+        self.assertEqual(item['author'], 'api_user')
+        response = self.guest_client.get(
+            reverse('api:post_list') + '?fields=password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_and_gzip(self):
+        """Ответы сжимаются и поддерживают If-None-Match."""
+        url = reverse('api:post_list')
+        response = self.guest_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('results', json.loads(gzip.decompress(response.content)))
+        response = self.guest_client.get(
+            url, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_guest_cannot_write(self):
+        response = self.send(
+            self.guest_client, 'post', reverse('api:post_list'),
+            {'text': 'Текст'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_create_and_edit_post(self):
+        """Автор создаёт и редактирует пост, чужой пост менять нельзя."""
+        response = self.send(
+            self.authorized_client, 'post', reverse('api:post_list'),
+            {'text': 'Новый пост', 'group': 'api-slug'})
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(pk=response.json()['id'])
+        self.assertEqual(post.group, self.group)
+        url = reverse('api:post_detail', kwargs={'post_id': post.id})
+        response = self.send(
+            self.authorized_client, 'patch', url, {'group': None})
+        self.assertIsNone(response.json()['group'])
+        other_client = Client()
+        other_client.force_login(self.other)
+        response = self.send(other_client, 'delete', url, {})
+        self.assertEqual(response.status_code, 403)
+
+    def test_comments_and_follow(self):
+        post = self.posts[0]
+        response = self.send(
+            self.authorized_client, 'post',
+            reverse('api:comment_list', kwargs={'post_id': post.id}),
+            {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Comment.objects.filter(post=post).exists())
+        response = self.send(
+            self.authorized_client, 'post', reverse('api:follow_list'),
+            {'author': 'api_other'})
+        self.assertEqual(response.status_code, 201)
+        response = self.authorized_client.delete(
+            reverse('api:follow_detail', kwargs={'username': 'api_other'}))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Follow.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   UPLOAD_DIR=os.path.join(TEMP_MEDIA_ROOT, 'uploads'))
+class UploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='uploader')
+        cls.post = Post.objects.create(author=cls.user, text='Без картинки')
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48), 'green').save(buffer, 'PNG')
+        cls.content = buffer.getvalue()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def start(self, content):
+        response = self.authorized_client.post(
+            reverse('api:upload_list'),
+            data=json.dumps({
+                'filename': 'photo.png',
+                'size': len(content),
+                'sha256': hashlib.sha256(content).hexdigest(),
+            }),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return response['Location']
+
+    def send_chunk(self, url, offset, chunk):
+        return self.authorized_client.patch(
+            url, data=chunk, content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset))
+
+    def complete(self, url):
+        return self.authorized_client.post(
+            url + 'complete/', data=json.dumps({'post': self.post.pk}),
+            content_type='application/json')
+
+    def test_resumable_upload_attaches_image(self):
+        """Файл собирается из частей, продолжается и попадает в пост."""
+        url = self.start(self.content)
+        middle = len(self.content) // 2
+        response = self.send_chunk(url, 0, self.content[:middle])
+        self.assertEqual(response.json()['offset'], middle)
+        self.assertEqual(self.complete(url).status_code, 409)
+        self.assertEqual(
+            self.send_chunk(url, 0, self.content[middle:]).status_code, 409)
+        offset = int(self.authorized_client.get(url)['Upload-Offset'])
+        self.send_chunk(url, offset, self.content[offset:])
+        response = self.complete(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['image'].endswith('.png'))
+        self.post.refresh_from_db()
+        with self.post.image.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertFalse(Upload.objects.exists())
+        self.assertEqual(os.listdir(settings.UPLOAD_DIR), [])
+
+    def test_checksum_mismatch_is_rejected(self):
+        """Файл с неверной суммой не попадает в пост."""
+        url = self.start(self.content)
+        damaged = b'\0' + self.content[1:]
+        self.send_chunk(url, 0, damaged)
+        self.assertEqual(self.complete(url).status_code, 400)
+        self.post.refresh_from_db()
+        self.assertFalse(self.post.image)
+        self.assertFalse(Upload.objects.exists())
@@ -0,0 +1,70 @@
+"""Сборка загрузок по частям на диске.
+
+Части дописываются в файл UPLOAD_DIR/<id>.part прямо из тела запроса
+небольшими блоками, контрольная сумма проверяется повторным потоковым
+чтением, а готовый файл отдаётся форме без загрузки в память. Расход
+памяти не зависит от размера файла.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+BLOCK_SIZE = 64 * 1024
+
+
+def part_path(upload):
+    return os.path.join(settings.UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def create_part(upload):
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload), 'wb').close()
+
+
+def append(upload, stream, length):
+    """Дописывает length байт из stream с позиции upload.offset.
+
+    Возвращает число записанных байт: при обрыве соединения это может
+    быть меньше length, клиент продолжит с нового смещения.
+    """
+    written = 0
+    with open(part_path(upload), 'r+b') as file:
+        # Хвост после прошлой неудачной записи отбрасывается.
+        file.truncate(upload.offset)
+        file.seek(upload.offset)
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            file.write(block)
+            written += len(block)
+    return written
+
+
+def checksum(upload):
+    hasher = hashlib.sha256()
+    with open(part_path(upload), 'rb') as file:
+        for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def remove(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+class AssembledFile(UploadedFile):
+    """Собранный файл, который формы и хранилище читают с диска."""
+
+    def __init__(self, upload):
+        self.path = part_path(upload)
+        super().__init__(
+            open(self.path, 'rb'), upload.filename, None, upload.size)
+
+    def temporary_file_path(self):
+        return self.path
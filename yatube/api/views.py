@@ -0,0 +1,552 @@
+import base64
+import binascii
+import json
+import os
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import conditional_page
+
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post
+from . import uploads
+from .models import Token, Upload
+
+User = get_user_model()
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+
+# Поля ресурса: имя в ответе -> (колонка для values(), преобразование).
+POST_FIELDS = {
+    'id': ('id', None),
+    'text': ('text', None),
+    'pub_date': ('pub_date', None),
+    'author': ('author__username', None),
+    'group': ('group__slug', None),
+    'image': ('image', image_url),
+}
+POST_ORDERING = ('-pub_date', '-id')
+
+GROUP_FIELDS = {
+    'id': ('id', None),
+    'title': ('title', None),
+    'slug': ('slug', None),
+    'description': ('description', None),
+}
+GROUP_ORDERING = ('slug',)
+
+COMMENT_FIELDS = {
+    'id': ('id', None),
+    'post': ('post_id', None),
+    'author': ('author__username', None),
+    'text': ('text', None),
+    'created': ('created', None),
+}
+COMMENT_ORDERING = ('-created', '-id')
+
+FOLLOW_FIELDS = {
+    'id': ('id', None),
+    'author': ('author__username', None),
+}
+FOLLOW_ORDERING = ('-id',)
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False),
+        content_type='application/json',
+        status=status,
+    )
+
+
+def unauthorized(detail='Требуется авторизация.'):
+    response = json_response({'detail': detail}, status=401)
+    response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+class CsrfCheck(CsrfViewMiddleware):
+    """Проверка CSRF, которая возвращает причину отказа вместо страницы."""
+
+    def _reject(self, request, reason):
+        return reason
+
+
+def csrf_rejection(request):
+    check = CsrfCheck()
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+
+def token_user(header):
+    """Пользователь по заголовку «Authorization: Token <ключ>» или None."""
+    scheme, _, key = header.partition(' ')
+    if scheme.lower() != 'token' or not key.strip():
+        return None
+    token = (Token.objects.select_related('user')
+             .filter(digest=Token.hash(key.strip())).first())
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def check_access(request, login, writes):
+    """Ответ с отказом или None, если запрос можно выполнять."""
+    header = request.META.get('HTTP_AUTHORIZATION')
+    if header:
+        user = token_user(header)
+        if user is None:
+            return unauthorized('Недействительный ключ API.')
+        request.user = user
+    elif writes and request.user.is_authenticated:
+        reason = csrf_rejection(request)
+        if reason:
+            return json_response(
+                {'detail': f'Проверка CSRF не пройдена: {reason}'},
+                status=403)
+    if login and not request.user.is_authenticated:
+        return unauthorized()
+    return None
+
+
+def api_view(*methods, login=False):
+    """Оборачивает представление API: методы, ошибки, ETag и gzip.
+
+    Клиент входит заголовком Authorization: Token <ключ> (ключ выдаёт
+    /api/v1/token/) и тогда CSRF не нужен. Запросы с cookie сессии, как
+    у сайта, проверяются на CSRF, а отказ возвращается JSON с кодом 403.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @gzip_page
+        @conditional_page
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = json_response(
+                    {'detail': 'Метод не разрешён.'}, status=405)
+                response['Allow'] = ', '.join(methods)
+                return response
+            writes = request.method not in ('GET', 'HEAD', 'OPTIONS')
+            rejection = check_access(request, login or writes, writes)
+            if rejection is not None:
+                return rejection
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return json_response(
+                    {'detail': error.detail}, status=error.status)
+        return wrapper
+    return decorator
+
+
+def read_json(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError(400, 'Тело запроса должно быть JSON.')
+    if not isinstance(data, dict):
+        raise ApiError(400, 'Тело запроса должно быть объектом JSON.')
+    return data
+
+
+def selected_fields(request, spec):
+    """Поля из параметра ?fields=, по умолчанию все."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(spec)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = set(names) - set(spec)
+    if unknown:
+        raise ApiError(
+            400, f'Неизвестные поля: {", ".join(sorted(unknown))}.')
+    return names
+
+
+def encode_cursor(values):
+    # Даты целиком, с микросекундами: DjangoJSONEncoder их обрезает.
+    raw = json.dumps(values, default=lambda value: value.isoformat()).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor, model, ordering):
+    """Значения курсора, приведённые к типам полей сортировки."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        raise ApiError(400, 'Некорректный курсор.')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ApiError(400, 'Некорректный курсор.')
+    fields = [model._meta.get_field(field.lstrip('-')) for field in ordering]
+    try:
+        values = [field.to_python(value)
+                  for field, value in zip(fields, values)]
+    except (ValidationError, ValueError, TypeError):
+        raise ApiError(400, 'Некорректный курсор.')
+    if None in values:
+        raise ApiError(400, 'Некорректный курсор.')
+    return values
+
+
+def keyset_filter(ordering, values):
+    """Условие «строго после курсора» для сортировки ordering."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError(400, 'limit должен быть числом.')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def serialize(rows, spec, fields):
+    results = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            column, convert = spec[name]
+            value = row[column]
+            item[name] = convert(value) if convert else value
+        results.append(item)
+    return results
+
+
+def cursor_page(request, queryset, spec, ordering):
+    """Страница списка по курсору, без создания экземпляров моделей.
+
+    Строки выбираются через values() только с нужными колонками, поэтому
+    размер ответа и работа сервера зависят лишь от ?fields= и ?limit=.
+    """
+    fields = selected_fields(request, spec)
+    limit = get_limit(request)
+    order_columns = [field.lstrip('-') for field in ordering]
+    cursor = request.GET.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        queryset = queryset.filter(keyset_filter(ordering, values))
+    columns = {spec[name][0] for name in fields} | set(order_columns)
+    rows = list(queryset.order_by(*ordering).values(*columns)[:limit + 1])
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        query = request.GET.copy()
+        query['cursor'] = encode_cursor(
+            [rows[-1][column] for column in order_columns])
+        next_url = request.build_absolute_uri(
+            f'{request.path}?{query.urlencode()}')
+    return json_response({
+        'next': next_url,
+        'results': serialize(rows, spec, fields),
+    })
+
+
+def single(request, queryset, spec):
+    fields = selected_fields(request, spec)
+    columns = {spec[name][0] for name in fields}
+    row = queryset.values(*columns).first()
+    if row is None:
+        raise ApiError(404, 'Не найдено.')
+    return serialize([row], spec, fields)[0]
+
+
+def form_errors(form):
+    return ApiError(400, {
+        field: [str(error) for error in errors]
+        for field, errors in form.errors.items()
+    })
+
+
+def post_form_data(data, post=None):
+    """Данные PostForm из JSON: группа передаётся по slug."""
+    form_data = {
+        'text': post.text if post else '',
+        'group': post.group_id if post else None,
+    }
+    if 'text' in data:
+        form_data['text'] = data['text']
+    if 'group' in data:
+        slug = data['group']
+        form_data['group'] = None
+        if slug:
+            group_id = (Group.objects.filter(slug=slug)
+                        .values_list('pk', flat=True).first())
+            if group_id is None:
+                raise ApiError(400, {'group': ['Группа не найдена.']})
+            form_data['group'] = group_id
+    return form_data
+
+
+def get_own_post(request, post_id):
+    if not isinstance(post_id, int) or isinstance(post_id, bool):
+        raise ApiError(404, 'Не найдено.')
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        raise ApiError(404, 'Не найдено.')
+    if post.author_id != request.user.pk:
+        raise ApiError(403, 'Изменять пост может только автор.')
+    return post
+
+
+@api_view('GET', 'POST')
+def post_list(request):
+    if request.method == 'POST':
+        form = PostForm(post_form_data(read_json(request)))
+        if not form.is_valid():
+            raise form_errors(form)
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+        return json_response(
+            single(request, Post.objects.filter(pk=post.pk), POST_FIELDS),
+            status=201)
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return cursor_page(request, posts, POST_FIELDS, POST_ORDERING)
+
+
+@api_view('GET', 'PUT', 'PATCH', 'DELETE')
+def post_detail(request, post_id):
+    if request.method == 'DELETE':
+        get_own_post(request, post_id).delete()
+        return HttpResponse(status=204)
+    if request.method in ('PUT', 'PATCH'):
+        post = get_own_post(request, post_id)
+        data = read_json(request)
+        if request.method == 'PUT' and 'text' not in data:
+            raise ApiError(400, {'text': ['Обязательное поле.']})
+        form = PostForm(post_form_data(data, post), instance=post)
+        if not form.is_valid():
+            raise form_errors(form)
+        form.save()
+    return json_response(
+        single(request, Post.objects.filter(pk=post_id), POST_FIELDS))
+
+
+@api_view('GET', 'POST')
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise ApiError(404, 'Не найдено.')
+    if request.method == 'POST':
+        form = CommentForm(read_json(request))
+        if not form.is_valid():
+            raise form_errors(form)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post_id = post_id
+        comment.save()
+        return json_response(
+            single(request, Comment.objects.filter(pk=comment.pk),
+                   COMMENT_FIELDS),
+            status=201)
+    return cursor_page(
+        request, Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS, COMMENT_ORDERING)
+
+
+@csrf_exempt
+def token(request):
+    """Выдаёт ключ API по имени и паролю (POST) или отзывает его (DELETE)."""
+    if request.method == 'DELETE':
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        user = token_user(header)
+        if user is None:
+            return unauthorized()
+        Token.objects.filter(user=user).delete()
+        return HttpResponse(status=204)
+    if request.method != 'POST':
+        response = json_response({'detail': 'Метод не разрешён.'}, status=405)
+        response['Allow'] = 'POST, DELETE'
+        return response
+    try:
+        data = read_json(request)
+    except ApiError as error:
+        return json_response({'detail': error.detail}, status=error.status)
+    user = authenticate(
+        request, username=str(data.get('username') or ''),
+        password=str(data.get('password') or ''))
+    if user is None:
+        return unauthorized('Неверное имя пользователя или пароль.')
+    return json_response({'token': Token.issue(user)}, status=201)
+
+
+@api_view('GET')
+def group_list(request):
+    return cursor_page(
+        request, Group.objects.all(), GROUP_FIELDS, GROUP_ORDERING)
+
+
+@api_view('GET')
+def group_detail(request, slug):
+    return json_response(
+        single(request, Group.objects.filter(slug=slug), GROUP_FIELDS))
+
+
+@api_view('GET', 'POST', login=True)
+def follow_list(request):
+    if request.method == 'POST':
+        username = read_json(request).get('author')
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise ApiError(400, {'author': ['Пользователь не найден.']})
+        if author == request.user:
+            raise ApiError(400, {'author': ['Нельзя подписаться на себя.']})
+        follow, created = Follow.objects.get_or_create(
+            user=request.user, author=author)
+        return json_response(
+            single(request, Follow.objects.filter(pk=follow.pk),
+                   FOLLOW_FIELDS),
+            status=201 if created else 200)
+    return cursor_page(
+        request, Follow.objects.filter(user=request.user),
+        FOLLOW_FIELDS, FOLLOW_ORDERING)
+
+
+@api_view('DELETE', login=True)
+def follow_detail(request, username):
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author__username=username).delete()
+    if not deleted:
+        raise ApiError(404, 'Подписка не найдена.')
+    return HttpResponse(status=204)
+
+
+def upload_response(upload, status=200):
+    response = json_response({
+        'id': upload.pk,
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+    }, status=status)
+    response['Upload-Offset'] = upload.offset
+    return response
+
+
+def get_own_upload(request, upload_id):
+    upload = Upload.objects.filter(pk=upload_id, owner=request.user).first()
+    if upload is None:
+        raise ApiError(404, 'Загрузка не найдена.')
+    return upload
+
+
+def discard(upload):
+    uploads.remove(upload)
+    upload.delete()
+
+
+@api_view('POST', login=True)
+def upload_list(request):
+    """Начинает загрузку: имя файла, размер и SHA-256 содержимого."""
+    data = read_json(request)
+    filename = os.path.basename(str(data.get('filename') or ''))
+    size = data.get('size')
+    sha256 = str(data.get('sha256') or '').lower()
+    errors = {}
+    if not filename:
+        errors['filename'] = ['Обязательное поле.']
+    if (not isinstance(size, int) or isinstance(size, bool)
+            or not 0 < size <= settings.UPLOAD_MAX_SIZE):
+        errors['size'] = [
+            f'Размер должен быть от 1 до {settings.UPLOAD_MAX_SIZE} байт.']
+    if not re.fullmatch(r'[0-9a-f]{64}', sha256):
+        errors['sha256'] = ['Ожидается SHA-256 в шестнадцатеричном виде.']
+    if errors:
+        raise ApiError(400, errors)
+    upload = Upload.objects.create(
+        owner=request.user, filename=filename[-255:], size=size,
+        sha256=sha256)
+    uploads.create_part(upload)
+    response = upload_response(upload, status=201)
+    response['Location'] = reverse('api:upload_detail', args=(upload.pk,))
+    return response
+
+
+@api_view('GET', 'PATCH', 'DELETE', login=True)
+def upload_detail(request, upload_id):
+    """Смещение загрузки, приём очередной части и отмена.
+
+    Часть передаётся телом PATCH с заголовком Upload-Offset, равным уже
+    принятому числу байт, и читается из запроса блоками прямо в файл.
+    """
+    upload = get_own_upload(request, upload_id)
+    if request.method == 'DELETE':
+        discard(upload)
+        return HttpResponse(status=204)
+    if request.method == 'PATCH':
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            raise ApiError(
+                400, 'Нужны заголовки Upload-Offset и Content-Length.')
+        if offset != upload.offset:
+            raise ApiError(409, f'Ожидалось смещение {upload.offset}.')
+        if offset + length > upload.size:
+            raise ApiError(413, 'Часть выходит за размер файла.')
+        written = uploads.append(upload, request, length)
+        # Смещение сдвигается, только если его не сдвинул другой запрос;
+        # испорченный гонкой файл всё равно не пройдёт проверку суммы.
+        Upload.objects.filter(pk=upload.pk, offset=offset).update(
+            offset=offset + written, updated=timezone.now())
+        upload.offset = offset + written
+    return upload_response(upload)
+
+
+@api_view('POST', login=True)
+def upload_complete(request, upload_id):
+    """Проверяет собранный файл и делает его картинкой поста."""
+    upload = get_own_upload(request, upload_id)
+    post = get_own_post(request, read_json(request).get('post'))
+    if upload.offset != upload.size:
+        raise ApiError(
+            409, f'Принято {upload.offset} из {upload.size} байт.')
+    if uploads.checksum(upload) != upload.sha256:
+        discard(upload)
+        raise ApiError(400, 'Контрольная сумма не совпала.')
+    with uploads.AssembledFile(upload) as file:
+        form = PostForm(
+            post_form_data({}, post), files={'image': file}, instance=post)
+        valid = form.is_valid()
+        if valid:
+            form.save()
+    discard(upload)
+    if not valid:
+        raise form_errors(form)
+    return json_response(
+        single(request, Post.objects.filter(pk=post.pk), POST_FIELDS))
@@ -0,0 +1,209 @@
+"""Шина инвалидации локальных кешей между узлами.
+
+Изменения публикуются строками в таблицу Invalidation (только вставка),
+а каждый процесс опрашивает её фоновым потоком и удаляет устаревшие
+ключи из своего кеша. Старые строки периодически удаляются.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Invalidation
+
+logger = logging.getLogger(__name__)
+
+KEY_SEPARATOR = '\n'
+
+_subscribers = []
+
+
+def _setting(name, default):
+    return getattr(settings, 'INVALIDATION_BUS_' + name, default)
+
+
+def enabled():
+    return _setting('ENABLED', False)
+
+
+def publish(*keys):
+    """Публикует ключи кеша, которые нужно сбросить на всех узлах.
+
+    Без включённой шины события никто не читает и не удаляет, поэтому
+    они не записываются.
+    """
+    keys = [key for key in keys if key]
+    if keys and enabled():
+        Invalidation.objects.create(keys=KEY_SEPARATOR.join(keys))
+
+
+def invalidate(*keys):
+    """Сбрасывает ключи на этом узле сразу, а на остальных через шину."""
+    keys = [key for key in keys if key]
+    if keys:
+        apply(keys)
+        publish(*keys)
+
+
+def subscribe(callback):
+    """Регистрирует обработчик, которому передаются сброшенные ключи."""
+    if callback not in _subscribers:
+        _subscribers.append(callback)
+    return callback
+
+
+def apply(keys):
+    """Сбрасывает ключи в локальном кеше и у подписчиков.
+
+    ``None`` вместо списка означает, что сбросить нужно всё.
+    """
+    if keys is None:
+        cache.clear()
+    else:
+        cache.delete_many(keys)
+    for callback in _subscribers:
+        callback(keys)
+
+
+class Poller(threading.Thread):
+    """Фоновый поток, применяющий события шины на этом узле.
+
+    Гарантия устаревания: данные отстают не больше чем на
+    ``poll_interval`` плюс время применения пачки. Если поток отстал
+    больше чем на ``max_staleness`` или пропустил удалённые при очистке
+    события, локальный кеш очищается целиком.
+
+    id выдаются до фиксации транзакции, поэтому строка с меньшим id может
+    стать видна после уже прочитанной с большим. События последних
+    ``grace`` секунд перечитываются, и применяются те, что ещё не
+    встречались.
+    """
+
+    def __init__(self, poll_interval=None, batch_size=None,
+                 retention=None, max_staleness=None, grace=None):
+        super().__init__(name='invalidation-bus', daemon=True)
+        self.poll_interval = poll_interval or _setting('POLL_INTERVAL', 1)
+        self.batch_size = batch_size or _setting('BATCH_SIZE', 500)
+        self.retention = retention or _setting('RETENTION', 3600)
+        self.max_staleness = max_staleness or _setting('MAX_STALENESS', 30)
+        self.grace = grace or _setting('GRACE', 30)
+        self.last_id = None
+        # id применённых событий за последние grace секунд -> created.
+        self.seen = {}
+        self.last_trim = None
+        self.stopped = threading.Event()
+        self.stats = {
+            'polls': 0,
+            'events': 0,
+            'keys': 0,
+            'full_clears': 0,
+            'last_lag': 0.0,
+            'max_lag': 0.0,
+            'last_poll': None,
+        }
+
+    def run(self):
+        while not self.stopped.wait(self.poll_interval):
+            try:
+                self.poll()
+                self.trim()
+            except Exception:
+                logger.exception('Ошибка опроса шины инвалидации')
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self.stopped.set()
+
+    def poll(self):
+        """Читает новые события пачками и применяет их."""
+        if self.last_id is None:
+            last = Invalidation.objects.order_by('-id').first()
+            self.last_id = last.id if last else 0
+        now = timezone.now()
+        last_poll = self.stats['last_poll']
+        if last_poll and (now - last_poll).total_seconds() > self.retention:
+            # События за время простоя могли быть уже удалены очисткой.
+            self._full_clear('опрос не выполнялся дольше срока хранения')
+        border = now - timedelta(seconds=self.grace)
+        late = [
+            pk for pk in Invalidation.objects
+            .filter(id__lte=self.last_id, created__gte=border)
+            .values_list('id', flat=True)
+            if pk not in self.seen
+        ]
+        if late:
+            self._apply_batch(list(
+                Invalidation.objects.filter(id__in=late)
+                .values_list('id', 'keys', 'created')
+            ), now)
+        while True:
+            batch = list(
+                Invalidation.objects
+                .filter(id__gt=self.last_id)
+                .values_list('id', 'keys', 'created')[:self.batch_size]
+            )
+            if not batch:
+                break
+            self._apply_batch(batch, now)
+            self.last_id = max(self.last_id, batch[-1][0])
+            if len(batch) < self.batch_size:
+                break
+        self.seen = {pk: created for pk, created in self.seen.items()
+                     if created >= border}
+        self.stats['polls'] += 1
+        self.stats['last_poll'] = now
+
+    def _apply_batch(self, batch, now):
+        keys = set()
+        for pk, joined, created in batch:
+            keys.update(joined.split(KEY_SEPARATOR))
+            self.seen[pk] = created
+        lag = (now - min(created for *_, created in batch)).total_seconds()
+        self._record_lag(lag)
+        if lag > self.max_staleness:
+            self._full_clear(f'отставание {lag:.1f} с')
+        else:
+            apply(list(keys))
+        self.stats['events'] += len(batch)
+        self.stats['keys'] += len(keys)
+
+    def trim(self):
+        """Удаляет события старше срока хранения."""
+        if (self.last_trim is not None
+                and time.monotonic() - self.last_trim < self.retention / 10):
+            return
+        self.last_trim = time.monotonic()
+        border = timezone.now() - timedelta(seconds=self.retention)
+        Invalidation.objects.filter(created__lt=border).delete()
+
+    def _record_lag(self, lag):
+        self.stats['last_lag'] = lag
+        self.stats['max_lag'] = max(self.stats['max_lag'], lag)
+
+    def _full_clear(self, reason):
+        logger.warning('Локальный кеш очищен целиком: %s', reason)
+        apply(None)
+        self.stats['full_clears'] += 1
+
+
+poller = None
+
+
+def start():
+    """Запускает опрос шины в этом процессе (один раз)."""
+    global poller
+    if poller is None:
+        poller = Poller()
+        poller.start()
+    return poller
+
+
+def stats():
+    """Метрики отставания для этого узла."""
+    return dict(poller.stats) if poller else {}
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import FileField
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_thumbnails
+
+from core.models import Blob
+from core.storage import ContentAddressedStorage
+
+
+def blob_fields():
+    """Поля моделей, которые хранят файлы по адресу содержимого."""
+    return [
+        field
+        for model in apps.get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, FileField)
+        and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы, на которые больше нет ссылок, и их миниатюры.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=60 * 60,
+                            help='Сколько секунд файл должен быть без '
+                                 'ссылок, прежде чем его удалить.')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        fields = blob_fields()
+        border = timezone.now() - timedelta(seconds=options['min_age'])
+        candidates = Blob.objects.filter(refcount__lte=0, updated__lt=border)
+        removed = 0
+        for blob in candidates.iterator():
+            referenced = any(
+                field.model._default_manager.filter(
+                    **{field.name: blob.name}).exists()
+                for field in fields
+            )
+            if referenced:
+                # Счётчик разошёлся с данными (например, после bulk_create),
+                # файл нужен, поэтому восстанавливаем число ссылок.
+                Blob.objects.filter(pk=blob.pk).update(refcount=sum(
+                    field.model._default_manager.filter(
+                        **{field.name: blob.name}).count()
+                    for field in fields
+                ))
+                continue
+            self.stdout.write(blob.name)
+            removed += 1
+            if options['dry_run']:
+                continue
+            for field in fields:
+                delete_thumbnails(
+                    field.attr_class(None, field, blob.name),
+                    delete_file=False)
+            fields[0].storage.delete(blob.name)
+            blob.delete()
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {removed}.'))
@@ -0,0 +1,49 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.tasks import work
+
+
+class Command(BaseCommand):
+    help = 'Запускает пул процессов, выполняющих фоновые задачи.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=settings.TASK_WORKERS)
+        parser.add_argument('--burst', action='store_true',
+                            help='Выйти, когда очередь опустеет.')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        if processes <= 1:
+            stop = threading.Event()
+            self.handle_signals(stop)
+            work(stop, options['burst'])
+            return
+        # Соединения с базой не должны достаться дочерним процессам.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        self.handle_signals(stop)
+        pool = [
+            context.Process(target=work, args=(stop, options['burst']),
+                            name=f'worker-{number}')
+            for number in range(processes)
+        ]
+        for process in pool:
+            process.start()
+        self.stdout.write(f'Запущено обработчиков: {processes}.')
+        for process in pool:
+            process.join()
+
+    def handle_signals(self, stop):
+        def shutdown(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
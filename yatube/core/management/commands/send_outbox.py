@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = 'Отправляет накопленные письма пачками и печатает скорость.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--rate', type=float,
+                            help='Не больше стольких писем в секунду.')
+
+    def handle(self, *args, **options):
+        sent, failed = outbox.drain(options['batch_size'], options['rate'])
+        stats = outbox.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Отправлено {sent}, ошибок {failed}, пачек {stats["batches"]}, '
+            f'{stats["per_second"]:.1f} писем/с, '
+            f'в очереди {stats["pending"]}.'))
@@ -0,0 +1,54 @@
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.staticfiles import HASHED_RE
+
+ASSET_RE = re.compile(r'''(?:href|src)=['"]([^'"]+)['"]''')
+
+
+def body(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+class Command(BaseCommand):
+    help = ('Считает байты и запросы статики при загрузке страницы: '
+            'исходные файлы без сжатия и кеша против хешированных '
+            'и сжатых копий.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='/')
+
+    def handle(self, *args, **options):
+        client = Client()
+        page = client.get(options['path'])
+        assets = sorted({
+            url for url in ASSET_RE.findall(page.content.decode())
+            if url.startswith(settings.STATIC_URL)
+        })
+        before_bytes = after_bytes = repeat_after = 0
+        for url in assets:
+            name = url[len(settings.STATIC_URL):]
+            original = finders.find(HASHED_RE.sub(
+                lambda match: os.path.splitext(match.group())[1], name))
+            size = os.path.getsize(original) if original else 0
+            response = client.get(url, HTTP_ACCEPT_ENCODING='br, gzip')
+            sent = len(body(response))
+            cached = 'immutable' in response.get('Cache-Control', '')
+            before_bytes += size
+            after_bytes += sent
+            repeat_after += not cached
+            self.stdout.write(
+                f'{name}: {size} -> {sent} байт '
+                f'({response.get("Content-Encoding", "без сжатия")}), '
+                f'{"кешируется навсегда" if cached else "проверяется"}')
+        self.stdout.write(
+            f'Файлов статики: {len(assets)}. Первая загрузка: '
+            f'{before_bytes} -> {after_bytes} байт. Запросов при повторном '
+            f'посещении: {len(assets)} -> {repeat_after}.')
@@ -0,0 +1,155 @@
+"""Раздача медиафайлов без DEBUG.
+
+Поддерживаются ETag и If-None-Match, запросы Range и долгое кеширование
+файлов, имена которых меняются вместе с содержимым (картинки постов по
+хешу и миниатюры sorl). Если перед приложением стоит nginx или Apache,
+сами байты отдаёт он по заголовку X-Accel-Redirect или X-Sendfile, а
+приложение только проверяет путь и ставит заголовки. Иначе полный файл
+отдаётся через FileResponse, который WSGI-сервер передаёт в
+wsgi.file_wrapper, то есть в sendfile(), а части файла читаются блоками.
+"""
+import mimetypes
+import os
+import re
+import stat
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
+
+BLOCK_SIZE = 64 * 1024
+YEAR = 365 * 24 * 60 * 60
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def resolve(path, root=None):
+    """Абсолютный путь к файлу внутри root (MEDIA_ROOT) или Http404."""
+    if any(part.startswith('.') for part in path.split('/')):
+        # Скрытые файлы, в том числе недописанные загрузки хранилища.
+        raise Http404
+    try:
+        full_path = safe_join(root or settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stats = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404
+    return full_path, stats
+
+
+def is_immutable(path):
+    return any(re.match(pattern, path)
+               for pattern in settings.MEDIA_IMMUTABLE_PATTERNS)
+
+
+def parse_range(header, size):
+    """(начало, конец) из заголовка Range, None для всего файла.
+
+    Поддерживается один диапазон; для нескольких отдаётся весь файл.
+    ValueError означает диапазон за пределами файла.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError
+    return start, end
+
+
+def read_range(full_path, start, length):
+    with open(full_path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            block = file.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def sendfile_response(full_path, path):
+    response = HttpResponse()
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + path
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def file_response(request, full_path, size):
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE', ''), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        return FileResponse(open(full_path, 'rb'))
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        read_range(full_path, start, end - start + 1), status=206)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = end - start + 1
+    return response
+
+
+def respond(request, full_path, stats, max_age, immutable=False,
+            offload=None, content_type=None, encoding=None):
+    """Ответ с файлом: условные запросы, Range и заголовки кеширования.
+
+    offload — функция без аргументов, которая строит ответ с заголовком
+    для фронтового сервера вместо чтения файла приложением. Без
+    content_type тип и кодировка угадываются по имени файла.
+    """
+    etag = quote_etag(f'{stats.st_mtime_ns:x}-{stats.st_size:x}')
+    last_modified = int(stats.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range and etag not in parse_etags(if_range):
+            # Файл изменился с тех пор, как клиент скачал начало.
+            request.META.pop('HTTP_RANGE', None)
+        if offload is not None:
+            response = offload()
+        else:
+            response = file_response(request, full_path, stats.st_size)
+        if content_type is None:
+            content_type, encoding = mimetypes.guess_type(full_path)
+        response['Content-Type'] = (content_type
+                                    or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if immutable:
+        patch_cache_control(
+            response, public=True, max_age=YEAR, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def serve(request, path):
+    full_path, stats = resolve(path)
+    offload = None
+    if settings.MEDIA_SENDFILE:
+        offload = partial(sendfile_response, full_path, path)
+    return respond(
+        request, full_path, stats, settings.MEDIA_CACHE_MAX_AGE,
+        immutable=is_immutable(path), offload=offload)
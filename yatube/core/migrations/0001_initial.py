@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-19 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Invalidation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keys', models.TextField(verbose_name='Ключи кеша')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата публикации')),
+            ],
+            options={
+                'verbose_name': 'Инвалидация кеша',
+                'verbose_name_plural': 'Инвалидации кеша',
+                'ordering': ['id'],
+            },
+        ),
+    ]
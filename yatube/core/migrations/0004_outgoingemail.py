@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.TextField(verbose_name='Тема')),
+                ('body', models.TextField(verbose_name='Текст')),
+                ('html_message', models.TextField(blank=True, verbose_name='HTML-версия')),
+                ('from_email', models.CharField(blank=True, max_length=254, verbose_name='Отправитель')),
+                ('recipients', models.TextField(verbose_name='Получатели, по одному в строке')),
+                ('available_at', models.DateTimeField(verbose_name='Отправить не раньше')),
+                ('claimed_by', models.CharField(blank=True, max_length=36, verbose_name='Отправитель пачки')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('failed', models.BooleanField(default=False, verbose_name='Не отправлено')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Исходящее письмо',
+                'verbose_name_plural': 'Исходящие письма',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outgoingemail',
+            index=models.Index(fields=['failed', 'available_at'], name='outbox_pending'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+from django.db import models
+
+
+class Invalidation(models.Model):
+    """Событие шины инвалидации: ключи кеша, которые устарели."""
+    keys = models.TextField('Ключи кеша')
+    created = models.DateTimeField(
+        'Дата публикации', auto_now_add=True, db_index=True
+    )
+
+    def __str__(self):
+        return self.keys
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Инвалидация кеша'
+        verbose_name_plural = 'Инвалидации кеша'
+
+
+class Blob(models.Model):
+    """Файл в хранилище по адресу содержимого и число ссылок на него."""
+    name = models.CharField('Путь в хранилище', max_length=255, unique=True)
+    refcount = models.IntegerField('Число ссылок', default=0)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+        indexes = [
+            models.Index(fields=['refcount', 'updated'], name='blob_gc'),
+        ]
+
+
+class Task(models.Model):
+    """Фоновая задача: путь к функции и её именованные аргументы."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField('Функция', max_length=255)
+    kwargs = models.TextField('Аргументы в JSON', default='{}')
+    priority = models.SmallIntegerField('Приоритет', default=0)
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Наибольшее число попыток', default=5)
+    run_at = models.DateTimeField('Выполнить не раньше')
+    locked_by = models.CharField('Обработчик', max_length=100, blank=True)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'],
+                         name='task_claim'),
+        ]
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (core.outbox)."""
+    subject = models.TextField('Тема')
+    body = models.TextField('Текст')
+    html_message = models.TextField('HTML-версия', blank=True)
+    from_email = models.CharField('Отправитель', max_length=254, blank=True)
+    recipients = models.TextField('Получатели, по одному в строке')
+    available_at = models.DateTimeField('Отправить не раньше')
+    claimed_by = models.CharField('Отправитель пачки', max_length=36,
+                                  blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    failed = models.BooleanField('Не отправлено', default=False)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    def __str__(self):
+        return self.subject
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(fields=['failed', 'available_at'],
+                         name='outbox_pending'),
+        ]
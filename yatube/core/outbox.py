@@ -0,0 +1,181 @@
+"""Исходящие письма: запись в запросе, отправка пачками в фоне.
+
+Запрос только сохраняет письмо в таблицу OutgoingEmail и ставит задачу
+drain_outbox (одну на письма за DEBOUNCE секунд). Задача забирает письма
+пачками по EMAIL_OUTBOX_BATCH_SIZE и отправляет каждую пачку через одно
+соединение с почтовым бэкендом (для SMTP — одна сессия вместо подключения
+на каждое письмо). Если задан EMAIL_OUTBOX_RATE, отправка не превышает
+этого числа писем в секунду.
+Если после выгрузки в ящике остались отложенные письма, задача ставит
+следующую на время, когда они станут доступны. Счётчики отправки
+доступны через stats().
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutgoingEmail, Task
+from .tasks import backoff, task
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд пачка принадлежит отправителю, прежде чем её сможет
+# забрать другой (если первый упал, не закончив).
+LEASE = 5 * 60
+# Письма, поставленные в пределах этого окна (в секундах), отправляет
+# одна задача drain_outbox.
+DEBOUNCE = 2
+
+_lock = threading.Lock()
+_stats = {'sent': 0, 'failed': 0, 'batches': 0, 'seconds': 0.0}
+
+
+def queue_email(subject, body, from_email, recipients, html_message=None):
+    """Сохраняет письмо и ставит отправку в очередь фоновых задач."""
+    email = OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_message=html_message or '',
+        from_email=from_email or '',
+        recipients='\n'.join(recipients),
+        available_at=timezone.now(),
+    )
+    schedule_drain(timezone.now() + timedelta(seconds=DEBOUNCE))
+    return email
+
+
+def schedule_drain(at):
+    """Ставит drain_outbox на время at, если до него не запустится другая.
+
+    Годится только задача, которая ещё не наступила: её наверняка не
+    забрал обработчик, и она увидит всё, что зафиксировано до её запуска.
+    Уже запущенная выгрузка могла сделать последнюю выборку раньше.
+    """
+    now = timezone.now()
+    if not Task.objects.filter(name=DRAIN_TASK, status=Task.QUEUED,
+                               run_at__gt=now, run_at__lte=at).exists():
+        drain_outbox.delay(countdown=max((at - now).total_seconds(), 0))
+
+
+def claim_batch(size):
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    candidates = list(
+        OutgoingEmail.objects.filter(failed=False, available_at__lte=now)
+        .order_by('available_at', 'id').values_list('pk', flat=True)[:size])
+    OutgoingEmail.objects.filter(
+        pk__in=candidates, available_at__lte=now,
+    ).update(claimed_by=token, available_at=now + timedelta(seconds=LEASE))
+    return list(OutgoingEmail.objects.filter(claimed_by=token)
+                .order_by('id'))
+
+
+def message(email, connection):
+    result = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email or None,
+        email.recipients.splitlines(), connection=connection)
+    if email.html_message:
+        result.attach_alternative(email.html_message, 'text/html')
+    return result
+
+
+class RateLimiter:
+    """Выдерживает не более rate событий в секунду (None — без ограничения)."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        delay = self.next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_at = max(self.next_at, time.monotonic()) + self.interval
+
+
+def send_batch(batch, limiter):
+    sent, failures = [], []
+    connection = get_connection()
+    connection.open()
+    try:
+        for email in batch:
+            limiter.wait()
+            try:
+                message(email, connection).send()
+            except Exception as error:
+                logger.warning('Письмо %s не отправлено: %s', email.pk, error)
+                failures.append((email, repr(error)))
+            else:
+                sent.append(email.pk)
+    finally:
+        connection.close()
+    OutgoingEmail.objects.filter(pk__in=sent).delete()
+    for email, error in failures:
+        attempts = email.attempts + 1
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            attempts=F('attempts') + 1,
+            failed=attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+            last_error=error,
+            claimed_by='',
+            available_at=timezone.now() + timedelta(
+                seconds=backoff(attempts)),
+        )
+    return len(sent), len(failures)
+
+
+def drain(batch_size=None, rate=None):
+    """Отправляет письма, пока они есть; возвращает (отправлено, ошибок)."""
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    limiter = RateLimiter(rate or settings.EMAIL_OUTBOX_RATE)
+    total_sent = total_failed = 0
+    while True:
+        batch = claim_batch(batch_size)
+        if not batch:
+            break
+        start = time.monotonic()
+        sent, failed = send_batch(batch, limiter)
+        elapsed = time.monotonic() - start
+        total_sent += sent
+        total_failed += failed
+        with _lock:
+            _stats['sent'] += sent
+            _stats['failed'] += failed
+            _stats['batches'] += 1
+            _stats['seconds'] += elapsed
+        logger.info('Пачка писем: отправлено %s, ошибок %s за %.2f с',
+                    sent, failed, elapsed)
+    # Письма, отложенные после ошибки или взятые упавшим отправителем,
+    # станут доступны позже — к этому времени ставится следующая выгрузка.
+    retry_at = (OutgoingEmail.objects.filter(failed=False)
+                .order_by('available_at')
+                .values_list('available_at', flat=True).first())
+    if retry_at is not None:
+        schedule_drain(retry_at)
+    return total_sent, total_failed
+
+
+@task(priority=10)
+def drain_outbox():
+    drain()
+
+
+DRAIN_TASK = f'{drain_outbox.__module__}.{drain_outbox.__qualname__}'
+
+
+def stats():
+    """Счётчики отправки этого процесса и средняя скорость в письмах/с."""
+    with _lock:
+        result = dict(_stats)
+    result['per_second'] = (result['sent'] / result['seconds']
+                            if result['seconds'] else 0.0)
+    result['pending'] = OutgoingEmail.objects.filter(failed=False).count()
+    return result
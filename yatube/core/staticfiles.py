@@ -0,0 +1,112 @@
+"""Статика с хешами в именах и заранее сжатыми копиями.
+
+При collectstatic файлы получают имена с хешем содержимого (манифест
+Django), а рядом с каждым сжимаемым файлом кладутся .gz и, если
+установлен пакет brotli, .br. Представление serve отдаёт сжатую копию по
+Accept-Encoding, а файлы с хешем в имени помечает неизменяемыми, так что
+браузер не запрашивает их повторно до выхода новой версии.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+
+from . import media
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+HASHED_RE = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+INCOMPRESSIBLE = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.woff', '.woff2',
+    '.gz', '.br', '.zip',
+}
+# Сжатая копия нужна, только если она заметно меньше исходника.
+MIN_SAVING = 0.05
+
+
+def encoders():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Файл, которого нет в манифесте, отдаётся под исходным именем,
+    # а не роняет страницу.
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Сжимаются исходники и окончательные имена с хешем, без
+        # промежуточных имён из нескольких проходов манифеста.
+        names = set(paths) | {self.clean_name(name)
+                              for name in self.hashed_files.values()}
+        for name in sorted(names):
+            self.compress(name)
+
+    def compress(self, name):
+        if os.path.splitext(name)[1].lower() in INCOMPRESSIBLE:
+            return
+        with self.open(name) as file:
+            data = file.read()
+        for suffix, encode in encoders():
+            compressed = encode(data)
+            if len(compressed) > len(data) * (1 - MIN_SAVING):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+
+def accepted_encodings(header):
+    codings = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        codings.add(coding.strip().lower())
+    return codings
+
+
+def serve(request, path):
+    """Отдаёт файл из STATIC_ROOT, сжатую копию — если клиент её примет."""
+    codings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    full_path = stats = encoding = content_type = None
+    for suffix, coding in (('.br', 'br'), ('.gz', 'gzip')):
+        if coding in codings:
+            try:
+                full_path, stats = media.resolve(
+                    path + suffix, settings.STATIC_ROOT)
+                encoding = coding
+                break
+            except Http404:
+                pass
+    if full_path is None:
+        full_path, stats = media.resolve(path, settings.STATIC_ROOT)
+    else:
+        # Тип берётся по исходному имени: mimetypes до Python 3.9 не
+        # знает .br и отдал бы сжатую копию как application/octet-stream.
+        content_type = (mimetypes.guess_type(path)[0]
+                        or 'application/octet-stream')
+    response = media.respond(
+        request, full_path, stats, settings.STATIC_CACHE_MAX_AGE,
+        immutable=bool(HASHED_RE.search(path)),
+        content_type=content_type, encoding=encoding)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
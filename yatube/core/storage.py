@@ -0,0 +1,88 @@
+"""Хранилище файлов по адресу содержимого.
+
+Загрузка хешируется SHA-256 по мере записи на диск и сохраняется под
+именем из хеша, поэтому одинаковые файлы хранятся один раз, а дубли
+получают уже существующий файл и построенные для него миниатюры. Число
+ссылок на каждый файл ведётся в таблице Blob, неиспользуемые файлы
+удаляет команда collect_blobs.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Blob
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменяется хешем содержимого в _save().
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        os.makedirs(self.location, exist_ok=True)
+        hasher = hashlib.sha256()
+        descriptor, temporary = tempfile.mkstemp(
+            dir=self.location, prefix='.upload-')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    file.write(chunk)
+            digest = hasher.hexdigest()
+            name = os.path.join(
+                directory, digest[:2], digest[2:4], digest + extension)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(temporary)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                file_move_safe(temporary, path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        name = name.replace('\\', '/')
+        # Файл учитывается сразу, даже если объект так и не сохранится:
+        # тогда его со временем удалит сборщик. Уже известный файл мог
+        # остаться без ссылок — отметка времени откладывает его сборку,
+        # пока загрузка, получившая его, не сохранит объект.
+        blob, created = Blob.objects.get_or_create(name=name)
+        if not created:
+            Blob.objects.filter(pk=blob.pk).update(updated=timezone.now())
+        return name
+
+
+def retain(name):
+    """Увеличивает число ссылок на файл."""
+    if not name:
+        return
+    if Blob.objects.filter(name=name).update(
+            refcount=F('refcount') + 1, updated=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(name=name, refcount=1)
+    except IntegrityError:
+        Blob.objects.filter(name=name).update(
+            refcount=F('refcount') + 1, updated=timezone.now())
+
+
+def release(name):
+    """Уменьшает число ссылок на файл.
+
+    update() не заполняет auto_now, а сборщик отсчитывает --min-age от
+    updated, поэтому время изменения ставится явно.
+    """
+    if name:
+        Blob.objects.filter(name=name).update(
+            refcount=F('refcount') - 1, updated=timezone.now())
@@ -0,0 +1,142 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача — функция, помеченная декоратором task, и её именованные
+аргументы в JSON. Вызов func.delay(...) записывает задачу в той же
+транзакции, что и изменения вызывающего кода, поэтому представление
+сразу отвечает, а задача не потеряется и не выполнится до фиксации.
+
+Обработчики (команда run_workers) забирают задачи атомарным
+UPDATE ... WHERE status = 'queued': из нескольких процессов задачу
+получает только тот, чей UPDATE изменил строку. Упавшая задача
+возвращается в очередь с экспоненциальной задержкой, пока не кончатся
+попытки. Выполненные задачи удаляются, чтобы таблица оставалась
+маленькой.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Сколько кандидатов выбирается за раз, чтобы соперничающие обработчики
+# не упирались в одну и ту же первую строку.
+CLAIM_BATCH = 10
+
+
+def task(func=None, *, priority=0, max_attempts=5):
+    """Помечает функцию задачей и добавляет ей метод delay(**kwargs)."""
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        def delay(countdown=0, **kwargs):
+            return enqueue(name, kwargs, priority=priority,
+                           max_attempts=max_attempts, countdown=countdown)
+
+        func.is_task = True
+        func.delay = delay
+        return func
+    return decorator(func) if func is not None else decorator
+
+
+def enqueue(name, kwargs=None, priority=0, max_attempts=5, countdown=0):
+    return Task.objects.create(
+        name=name,
+        kwargs=json.dumps(kwargs or {}),
+        priority=priority,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=countdown),
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    """Забирает самую приоритетную готовую задачу или возвращает None."""
+    now = timezone.now()
+    candidates = (Task.objects
+                  .filter(status=Task.QUEUED, run_at__lte=now)
+                  .order_by('-priority', 'run_at', 'id')
+                  .values_list('pk', flat=True)[:CLAIM_BATCH])
+    for pk in candidates:
+        claimed = Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1)
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def backoff(attempts):
+    delay = min(settings.TASK_RETRY_DELAY * 2 ** (attempts - 1),
+                settings.TASK_RETRY_MAX_DELAY)
+    return delay * random.uniform(1, 1.1)
+
+
+def execute(task):
+    """Выполняет взятую задачу и записывает результат."""
+    try:
+        func = import_string(task.name)
+        if not getattr(func, 'is_task', False):
+            raise ImportError(f'{task.name} не помечена как задача.')
+        func(**json.loads(task.kwargs))
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s (%s) упала', task.pk, task.name)
+        if task.attempts >= task.max_attempts:
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.FAILED, last_error=error)
+        else:
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.QUEUED, last_error=error, locked_by='',
+                run_at=timezone.now() + timedelta(
+                    seconds=backoff(task.attempts)))
+        return False
+    Task.objects.filter(pk=task.pk).delete()
+    return True
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи обработчиков, которые не отвечают.
+
+    Задача, исчерпавшая попытки, помечается упавшей: если она сама
+    роняет обработчик, повторять её бесконечно нельзя.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.TASK_TIMEOUT)
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=deadline)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, locked_by='',
+        last_error='Обработчик не ответил за TASK_TIMEOUT.')
+    return stale.update(status=Task.QUEUED, locked_by='')
+
+
+def work(stop, burst=False):
+    """Цикл обработчика: выполняет задачи, пока не выставлен stop.
+
+    С burst=True выходит, как только очередь опустеет.
+    """
+    worker = worker_name()
+    while not stop.is_set():
+        close_old_connections()
+        task = claim(worker)
+        if task is None:
+            if burst:
+                break
+            requeue_stale()
+            stop.wait(settings.TASK_POLL_INTERVAL)
+            continue
+        execute(task)
+    close_old_connections()
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core import invalidation
+from core.models import Invalidation
+
+
+@override_settings(INVALIDATION_BUS_ENABLED=True)
+class InvalidationBusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.poller = invalidation.Poller(
+            poll_interval=1, batch_size=2, max_staleness=30)
+        self.poller.poll()
+
+    def test_publish_and_poll_deletes_keys(self):
+        """Опубликованные ключи удаляются из локального кеша."""
+        cache.set('post:1', 'old')
+        cache.set('post:2', 'old')
+        cache.set('post:3', 'fresh')
+        invalidation.publish('post:1')
+        invalidation.publish('post:2', '')
+        invalidation.publish()
+        self.poller.poll()
+        self.assertIsNone(cache.get('post:1'))
+        self.assertIsNone(cache.get('post:2'))
+        self.assertEqual(cache.get('post:3'), 'fresh')
+        self.assertEqual(self.poller.stats['events'], 2)
+
+    def test_batches_are_read_until_exhausted(self):
+        """Опрос читает все новые события пачками."""
+        for i in range(5):
+            cache.set(f'post:{i}', 'old')
+            invalidation.publish(f'post:{i}')
+        self.poller.poll()
+        self.assertEqual(self.poller.stats['events'], 5)
+        self.assertEqual(cache.get_many([f'post:{i}' for i in range(5)]), {})
+
+    def test_event_committed_out_of_id_order_is_applied(self):
+        """Событие, ставшее видимым после большего id, не теряется."""
+        invalidation.publish('post:1')
+        invalidation.publish('post:2')
+        late = Invalidation.objects.order_by('id').first()
+        late.delete()  # ещё не зафиксировано
+        self.poller.poll()
+        cache.set('post:1', 'old')
+        cache.set('post:2', 'fresh')
+        Invalidation.objects.create(id=late.id, keys='post:1')
+        self.poller.poll()
+        self.assertIsNone(cache.get('post:1'))
+        self.assertEqual(cache.get('post:2'), 'fresh')
+        self.poller.poll()
+        self.assertEqual(self.poller.stats['events'], 2)
+
+    def test_lagging_poller_clears_whole_cache(self):
+        """При отставании больше допустимого кеш очищается целиком."""
+        cache.set('unrelated', 'value')
+        invalidation.publish('post:1')
+        Invalidation.objects.update(
+            created=Invalidation.objects.get().created - timedelta(minutes=5))
+        self.poller.poll()
+        self.assertIsNone(cache.get('unrelated'))
+        self.assertEqual(self.poller.stats['full_clears'], 1)
+        self.assertGreater(self.poller.stats['max_lag'], 30)
+
+    def test_subscribers_receive_keys(self):
+        """Подписчики получают сброшенные ключи."""
+        received = []
+        invalidation.subscribe(received.append)
+        self.addCleanup(invalidation._subscribers.remove, received.append)
+        invalidation.publish('group:test')
+        self.poller.poll()
+        self.assertEqual(received, [['group:test']])
+
+    def test_trim_removes_old_events(self):
+        """Очистка удаляет события старше срока хранения."""
+        invalidation.publish('post:1')
+        Invalidation.objects.update(
+            created=Invalidation.objects.get().created - timedelta(days=1))
+        invalidation.publish('post:2')
+        self.poller.trim()
+        self.assertEqual(Invalidation.objects.count(), 1)
+
+    @override_settings(INVALIDATION_BUS_ENABLED=False)
+    def test_disabled_bus_applies_locally_without_rows(self):
+        """Без шины ключи сбрасываются на узле, а строки не пишутся."""
+        cache.set('post:1', 'old')
+        invalidation.invalidate('post:1')
+        self.assertIsNone(cache.get('post:1'))
+        self.assertFalse(Invalidation.objects.exists())
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+DIGEST = 'ab' * 32
+IMMUTABLE_NAME = f'posts/ab/ab/{DIGEST}.jpg'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaServingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.content = bytes(range(256)) * 4
+        for name in (IMMUTABLE_NAME, 'other/file.txt', 'posts/.upload-x'):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(cls.content)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def url(self, name):
+        return settings.MEDIA_URL + name
+
+    def test_full_file_and_etag(self):
+        """Файл отдаётся целиком, повтор с ETag получает 304."""
+        response = self.client.get(self.url(IMMUTABLE_NAME))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get(
+            self.url(IMMUTABLE_NAME), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url('other/file.txt'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_range_requests(self):
+        """Запросы Range отдают нужный кусок файла."""
+        cases = (
+            ('bytes=10-19', 206, self.content[10:20]),
+            ('bytes=-5', 206, self.content[-5:]),
+            ('bytes=1000-', 206, self.content[1000:]),
+        )
+        for header, status, body in cases:
+            with self.subTest(header=header):
+                response = self.client.get(
+                    self.url(IMMUTABLE_NAME), HTTP_RANGE=header)
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(b''.join(response.streaming_content), body)
+        response = self.client.get(
+            self.url(IMMUTABLE_NAME), HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+        response = self.client.get(
+            self.url(IMMUTABLE_NAME), HTTP_RANGE='bytes=0-9',
+            HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_hidden_and_outside_files_are_not_served(self):
+        """Скрытые файлы и пути вне MEDIA_ROOT дают 404."""
+        for name in ('posts/.upload-x', '../manage.py', 'missing.jpg'):
+            with self.subTest(name=name):
+                response = self.client.get(self.url(name))
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_offload_to_front_server(self):
+        """С X-Accel-Redirect байты отдаёт фронтовой сервер."""
+        response = self.client.get(self.url(IMMUTABLE_NAME))
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            settings.MEDIA_ACCEL_PREFIX + IMMUTABLE_NAME)
+        self.assertEqual(response.content, b'')
@@ -0,0 +1,73 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+
+from core import outbox
+from core.models import OutgoingEmail, Task
+
+
+@override_settings(EMAIL_OUTBOX_BATCH_SIZE=3)
+class OutboxTests(TestCase):
+    def queue(self, count):
+        for number in range(count):
+            outbox.queue_email(
+                f'Письмо {number}', 'Текст', 'yatube@example.com',
+                [f'user{number}@example.com'])
+
+    def test_one_drain_task_and_connection_per_batch(self):
+        """Письма уходят пачками, по соединению на пачку."""
+        self.queue(7)
+        self.assertEqual(Task.objects.count(), 1)
+        with mock.patch('core.outbox.get_connection',
+                        wraps=get_connection) as connection:
+            self.assertEqual(outbox.drain(), (7, 0))
+        self.assertEqual(connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+    def test_failed_message_is_retried_later(self):
+        self.queue(2)
+        original = outbox.message
+
+        def flaky(email, connection):
+            if email.subject == 'Письмо 0':
+                raise OSError('почтовый сервер недоступен')
+            return original(email, connection)
+
+        with mock.patch('core.outbox.message', flaky), \
+                self.assertLogs('core.outbox', 'WARNING'):
+            self.assertEqual(outbox.drain(), (1, 1))
+        email = OutgoingEmail.objects.get()
+        self.assertEqual((email.subject, email.attempts), ('Письмо 0', 1))
+        self.assertEqual(outbox.drain(), (0, 0))
+
+    def test_drain_schedules_retry_of_deferred_emails(self):
+        """Отложенные и чужие просроченные письма не остаются без задачи."""
+        self.queue(1)
+        Task.objects.all().delete()
+        outbox.claim_batch(10)  # отправитель взял пачку и упал
+        self.assertEqual(outbox.drain(), (0, 0))
+        task = Task.objects.get(name=outbox.DRAIN_TASK)
+        self.assertAlmostEqual(task.run_at,
+                               OutgoingEmail.objects.get().available_at,
+                               delta=timedelta(seconds=1))
+
+    def test_running_drain_does_not_absorb_new_email(self):
+        """Письмо, поставленное во время выгрузки, получает свою задачу."""
+        self.queue(1)
+        Task.objects.update(status=Task.RUNNING)
+        self.queue(1)
+        self.assertEqual(
+            Task.objects.filter(status=Task.QUEUED).count(), 1)
+
+    def test_rate_cap(self):
+        """Отправка не быстрее заданного числа писем в секунду."""
+        self.queue(5)
+        start = time.monotonic()
+        outbox.drain(rate=50)
+        self.assertGreaterEqual(time.monotonic() - start, 4 / 50)
+        self.assertEqual(len(mail.outbox), 5)
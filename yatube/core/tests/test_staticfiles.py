@@ -0,0 +1,77 @@
+import gzip
+import mimetypes
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SOURCE_DIR = os.path.join(TEMP_DIR, 'source')
+STATIC_ROOT = os.path.join(TEMP_DIR, 'collected')
+
+CSS = 'body { margin: 0; }\n' * 200
+
+
+@override_settings(
+    STATICFILES_DIRS=[SOURCE_DIR],
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_STORAGE=(
+        'core.staticfiles.CompressedManifestStaticFilesStorage'),
+)
+class CompressedStaticTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(SOURCE_DIR, 'css'))
+        with open(os.path.join(SOURCE_DIR, 'css', 'site.css'), 'w') as file:
+            file.write(CSS)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_hashed_and_precompressed(self):
+        """Сжатая копия отдаётся по Accept-Encoding и кешируется навсегда."""
+        call_command('collectstatic', interactive=False, verbosity=0)
+        url = staticfiles_storage.url('css/site.css')
+        self.assertRegex(url, r'/css/site\.[0-9a-f]{12}\.css$')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('immutable', response['Cache-Control'])
+        content = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(content).decode(), CSS)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(), CSS)
+        response = self.client.get(settings.STATIC_URL + 'css/site.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_brotli_headers_come_from_original_name(self):
+        """Копия .br отдаётся с типом исходника даже без .br в mimetypes."""
+        os.makedirs(os.path.join(STATIC_ROOT, 'css'), exist_ok=True)
+        with open(os.path.join(STATIC_ROOT, 'css', 'plain.css.br'),
+                  'wb') as file:
+            file.write(b'brotli')
+        guess_type = mimetypes.guess_type
+
+        def old_guess_type(url, strict=True):
+            # Так mimetypes вели себя до Python 3.9.
+            if url.endswith('.br'):
+                return None, None
+            return guess_type(url, strict)
+
+        with mock.patch('mimetypes.guess_type', old_guess_type):
+            response = self.client.get(
+                settings.STATIC_URL + 'css/plain.css',
+                HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['Content-Type'], 'text/css')
@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import Blob
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='meme_lover')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user,
+            text='Мем',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_duplicates_share_one_file(self):
+        """Одинаковые загрузки хранятся одним файлом со счётчиком ссылок."""
+        first = self.create_post('meme.gif')
+        second = self.create_post('meme-copy.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(Blob.objects.get(name=first.image.name).refcount, 2)
+        second.delete()
+        self.assertEqual(Blob.objects.get(name=first.image.name).refcount, 1)
+
+    def test_collect_blobs_removes_only_unreferenced(self):
+        """Сборщик удаляет файлы без ссылок и оставляет нужные."""
+        kept = self.create_post('kept.gif')
+        storage = kept.image.storage
+        orphan = storage.save('posts/other.gif', ContentFile(b'other'))
+        Blob.objects.update(
+            refcount=0, updated=timezone.now() - timedelta(days=1))
+        call_command('collect_blobs', stdout=StringIO())
+        self.assertFalse(storage.exists(orphan))
+        self.assertTrue(storage.exists(kept.image.name))
+        self.assertEqual(
+            list(Blob.objects.values_list('name', 'refcount')),
+            [(kept.image.name, 1)])
+
+    def test_release_and_reupload_restart_collection_age(self):
+        """Возраст для сборщика считается с последнего изменения ссылок."""
+        post = self.create_post('meme.gif')
+        name = post.image.name
+        long_ago = timezone.now() - timedelta(days=1)
+        Blob.objects.update(updated=long_ago)
+        post.delete()
+        self.assertGreater(Blob.objects.get(name=name).updated, long_ago)
+        Blob.objects.update(updated=long_ago)
+        post.image.storage.save('posts/again.gif', ContentFile(SMALL_GIF))
+        self.assertGreater(Blob.objects.get(name=name).updated, long_ago)
@@ -0,0 +1,96 @@
+import threading
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+User = get_user_model()
+
+calls = []
+
+
+@tasks.task
+def record(value):
+    calls.append(value)
+
+
+@tasks.task(max_attempts=2)
+def broken():
+    raise RuntimeError('сломалось')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def drain(self):
+        tasks.work(threading.Event(), burst=True)
+
+    def test_tasks_run_by_priority_and_are_removed(self):
+        """Задачи выполняются по приоритету и удаляются после успеха."""
+        tasks.enqueue(record.__module__ + '.record', {'value': 'обычная'})
+        tasks.enqueue(record.__module__ + '.record', {'value': 'срочная'},
+                      priority=5)
+        record.delay(value='отложенная', countdown=60)
+        self.drain()
+        self.assertEqual(calls, ['срочная', 'обычная'])
+        self.assertEqual(
+            list(Task.objects.values_list('status', flat=True)),
+            [Task.QUEUED])
+
+    def test_claimed_task_is_not_claimed_again(self):
+        record.delay(value=1)
+        self.assertIsNotNone(tasks.claim('first'))
+        self.assertIsNone(tasks.claim('second'))
+
+    def test_failed_task_retries_with_backoff(self):
+        """Упавшая задача откладывается, а после попыток помечается."""
+        broken.delay()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.drain()
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('сломалось', task.last_error)
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.drain()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_stale_task_out_of_attempts_fails(self):
+        """Задача, которая роняет обработчик, не повторяется без конца."""
+        broken.delay()
+        record.delay(value=1)
+        for worker in ('first', 'second'):
+            self.assertIsNotNone(tasks.claim(worker))
+        Task.objects.update(
+            locked_at=timezone.now() - timedelta(days=1),
+            attempts=F('max_attempts'))
+        Task.objects.filter(max_attempts=5).update(attempts=1)
+        self.assertEqual(tasks.requeue_stale(), 1)
+        self.assertEqual(
+            dict(Task.objects.values_list('max_attempts', 'status')),
+            {2: Task.FAILED, 5: Task.QUEUED})
+
+    def test_password_reset_mail_is_queued(self):
+        """Письмо сброса пароля уходит из очереди, а не из запроса."""
+        User.objects.create_user(
+            username='forgetful', email='forgetful@example.com',
+            password='password')
+        response = self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'forgetful@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        Task.objects.update(run_at=timezone.now())
+        self.drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['forgetful@example.com'])
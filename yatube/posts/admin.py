@@ -1,4 +1,10 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from . import similarity
 from .models import Post, Group, Comment
 
 
@@ -15,6 +21,42 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:post_id>/similar/',
+                self.admin_site.admin_view(self.similar_view),
+                name='posts_post_similar',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def similar_view(self, request, post_id):
+        """Посты с похожими картинками по перцептивному хешу."""
+        post = get_object_or_404(Post, pk=post_id)
+        if not self.has_view_permission(request, post):
+            raise PermissionDenied
+        try:
+            distance = int(request.GET['distance'])
+        except (KeyError, ValueError):
+            distance = similarity.default_distance()
+        distance = max(0, min(distance, similarity.MAX_DISTANCE))
+        matches = similarity.similar_posts(post, distance)
+        posts = Post.objects.select_related('author').in_bulk(
+            [post_id for post_id, _ in matches])
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Похожие картинки',
+            'opts': self.model._meta,
+            'original': post,
+            'distance': distance,
+            'max_distance': similarity.MAX_DISTANCE,
+            'matches': [(posts[pk], bits) for pk, bits in matches
+                        if pk in posts],
+        }
+        return TemplateResponse(
+            request, 'admin/posts/post/similar.html', context)
+
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = (
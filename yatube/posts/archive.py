@@ -0,0 +1,126 @@
+"""Архив постов по годам и месяцам.
+
+PostCountBucket хранит число постов за каждый месяц для всего сайта,
+каждой группы и каждого автора. Счётчики меняют сигналы при создании,
+переносе в другую группу и удалении поста, поэтому навигация по архиву
+читает готовые числа, а не агрегирует посты в запросе. Посты месяца
+выбираются по диапазону pub_date, который обслуживают индексы
+(pub_date), (group, pub_date) и (author, pub_date), без OFFSET по всей
+ленте.
+"""
+import datetime
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .models import Post, PostCountBucket
+
+SITE = PostCountBucket.SITE
+GROUP = PostCountBucket.GROUP
+AUTHOR = PostCountBucket.AUTHOR
+
+
+def period_bounds(year, month=None):
+    """Начало и конец (не включая) года или месяца в текущей зоне."""
+    if month is None:
+        start = datetime.datetime(year, 1, 1)
+        end = datetime.datetime(year + 1, 1, 1)
+    else:
+        start = datetime.datetime(year, month, 1)
+        end = (datetime.datetime(year + 1, 1, 1) if month == 12
+               else datetime.datetime(year, month + 1, 1))
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def bucket_keys(post, group_id=None):
+    moment = timezone.localtime(post.pub_date)
+    yield SITE, 0, moment.year, moment.month
+    yield AUTHOR, post.author_id, moment.year, moment.month
+    group_id = post.group_id if group_id is None else group_id
+    if group_id:
+        yield GROUP, group_id, moment.year, moment.month
+
+
+def apply(deltas):
+    """Прибавляет к счётчикам изменения {(раздел, id, год, месяц): n}."""
+    for (scope, key, year, month), delta in deltas.items():
+        if not delta:
+            continue
+        buckets = PostCountBucket.objects.filter(
+            scope=scope, key=key, year=year, month=month)
+        if buckets.update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                PostCountBucket.objects.create(
+                    scope=scope, key=key, year=year, month=month,
+                    count=delta)
+        except IntegrityError:
+            buckets.update(count=F('count') + delta)
+
+
+def add_posts(posts, sign=1):
+    deltas = Counter()
+    for post in posts:
+        for bucket in bucket_keys(post):
+            deltas[bucket] += sign
+    apply(deltas)
+
+
+def move_post(post, old_group_id):
+    """Переносит пост из счётчиков старой группы в новую."""
+    moment = timezone.localtime(post.pub_date)
+    deltas = Counter()
+    if old_group_id:
+        deltas[GROUP, old_group_id, moment.year, moment.month] -= 1
+    if post.group_id:
+        deltas[GROUP, post.group_id, moment.year, moment.month] += 1
+    apply(deltas)
+
+
+def rebuild():
+    """Пересчитывает все счётчики по постам, возвращает их число."""
+    posts = Post.objects.annotate(
+        year=ExtractYear('pub_date'), month=ExtractMonth('pub_date'))
+    buckets = []
+    for scope, field in ((SITE, None), (AUTHOR, 'author_id'),
+                         (GROUP, 'group_id')):
+        rows = posts.order_by()
+        if field:
+            rows = rows.exclude(**{field: None})
+        columns = [field] if field else []
+        for row in rows.values(*columns, 'year', 'month').annotate(
+                count=Count('id')):
+            buckets.append(PostCountBucket(
+                scope=scope, key=row[field] if field else 0,
+                year=row['year'], month=row['month'], count=row['count']))
+    with transaction.atomic():
+        PostCountBucket.objects.all().delete()
+        PostCountBucket.objects.bulk_create(buckets)
+    return len(buckets)
+
+
+def navigation(scope, key, link):
+    """Годы и месяцы с постами, новые первыми.
+
+    link(year, month=None) возвращает адрес страницы архива.
+    """
+    years = []
+    buckets = (PostCountBucket.objects
+               .filter(scope=scope, key=key, count__gt=0)
+               .order_by('-year', '-month')
+               .values_list('year', 'month', 'count'))
+    for year, month, count in buckets:
+        if not years or years[-1]['year'] != year:
+            years.append({'year': year, 'count': 0, 'url': link(year),
+                          'months': []})
+        years[-1]['count'] += count
+        years[-1]['months'].append({
+            'start': datetime.date(year, month, 1),
+            'count': count,
+            'url': link(year, month),
+        })
+    return years
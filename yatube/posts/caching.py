@@ -0,0 +1,154 @@
+import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from core import invalidation
+from core.lru import LRUCache
+from .models import Group, Post
+from .projections import project, to_records
+
+User = get_user_model()
+
+groups = LRUCache(
+    maxsize=getattr(settings, 'LOOKUP_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'LOOKUP_CACHE_TTL', 300),
+)
+authors = LRUCache(
+    maxsize=getattr(settings, 'LOOKUP_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'LOOKUP_CACHE_TTL', 300),
+)
+
+
+def post_key(post_id):
+    return f'post:{post_id}'
+
+
+def author_posts_key(author_id):
+    return f'author_posts:{author_id}'
+
+
+def group_key(slug):
+    return f'group:{slug}'
+
+
+def user_key(username):
+    return f'user:{username}'
+
+
+def _cached_lookup(lru, key, model, **lookup):
+    obj = lru.get(key)
+    if obj is None:
+        try:
+            obj = model.objects.get(**lookup)
+        except model.DoesNotExist:
+            raise Http404(
+                f'No {model._meta.object_name} matches the given query.')
+        lru.set(key, obj)
+    # Копия, чтобы запросы не делили изменяемое состояние объекта.
+    return copy.copy(obj)
+
+
+def get_group(slug):
+    """Группа по slug из кеша процесса или 404."""
+    return _cached_lookup(groups, group_key(slug), Group, slug=slug)
+
+
+def get_author(username):
+    """Пользователь по username из кеша процесса или 404."""
+    return _cached_lookup(
+        authors, user_key(username), User, username=username)
+
+
+def post_from_row(row):
+    """Пост с автором и группой только из закешированных колонок ленты."""
+    post = Post(
+        id=row['id'],
+        text=row['text'],
+        pub_date=row['pub_date'],
+        image=row['image'],
+        placeholder=row['placeholder'],
+        author_id=row['author_id'],
+        group_id=row['group_id'],
+    )
+    post._state.adding = False
+    post.author = User(
+        id=row['author_id'],
+        username=row['author__username'],
+        first_name=row['author__first_name'],
+        last_name=row['author__last_name'],
+    )
+    if row['group_id'] is not None:
+        post.group = Group(
+            id=row['group_id'],
+            title=row['group__title'],
+            slug=row['group__slug'],
+        )
+    return post
+
+
+def get_post_bundle(post_id):
+    """Пост с автором, группой и числом комментариев из общего кеша.
+
+    В кеше лежат только колонки ленты (для автора — username и имя, без
+    пароля и почты) и адреса вариантов картинки, объекты для шаблона
+    собираются из них на каждый запрос. Сбрасывается сигналами при
+    изменении поста, его комментариев, автора и группы.
+    """
+    key = post_key(post_id)
+    bundle = cache.get(key)
+    if bundle is None:
+        row = get_object_or_404(
+            project(Post.objects).annotate(comment_count=Count('comments')),
+            pk=post_id,
+        )
+        comment_count = row.pop('comment_count')
+        record, = to_records([row])
+        bundle = {
+            'row': row,
+            'variant_list': record.variant_list,
+            'comment_count': comment_count,
+        }
+        cache.set(key, bundle, settings.POST_CACHE_TIMEOUT)
+    post = post_from_row(bundle['row'])
+    post.variant_list = bundle['variant_list']
+    return {'post': post, 'comment_count': bundle['comment_count']}
+
+
+def get_author_post_count(author_id):
+    key = author_posts_key(author_id)
+    count = cache.get(key)
+    if count is None:
+        count = Post.objects.filter(author_id=author_id).count()
+        cache.set(key, count, settings.POST_CACHE_TIMEOUT)
+    return count
+
+
+def forget_group(group):
+    groups.delete(group_key(group.slug))
+    # slug мог измениться, старый ключ ищем по pk.
+    groups.discard_if(lambda cached: cached.pk == group.pk)
+
+
+def forget_author(user):
+    authors.delete(user_key(user.username))
+    authors.discard_if(lambda cached: cached.pk == user.pk)
+
+
+@invalidation.subscribe
+def _apply_invalidation(keys):
+    if keys is None:
+        groups.clear()
+        authors.clear()
+        return
+    for key in keys:
+        groups.delete(key)
+        authors.delete(key)
+
+
+def lookup_stats():
+    return {'groups': groups.stats(), 'authors': authors.stats()}
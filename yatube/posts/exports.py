@@ -0,0 +1,73 @@
+"""Потоковая выгрузка постов в JSONL и CSV с постоянным расходом памяти."""
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'text': 'text',
+    'image': 'image',
+}
+FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CHUNK_SIZE = 2000
+
+
+def export_rows(posts, chunk_size=CHUNK_SIZE):
+    """Строки постов без создания экземпляров моделей, по chunk_size."""
+    rows = posts.values_list(*EXPORT_COLUMNS.values())
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(EXPORT_COLUMNS, row))
+
+
+def jsonl_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+class _Line:
+    """Файлоподобный объект, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(list(EXPORT_COLUMNS))
+    for row in rows:
+        yield writer.writerow(row.values())
+
+
+def serialize(rows, fmt):
+    lines = jsonl_lines(rows) if fmt == 'jsonl' else csv_lines(rows)
+    for line in lines:
+        yield line.encode()
+
+
+def gzip_stream(chunks, level=6, flush_every=64 * 1024):
+    """Сжимает поток байтов в gzip на лету, отдавая блоки по мере роста."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    for chunk in chunks:
+        pending += len(chunk)
+        data = compressor.compress(chunk)
+        if pending >= flush_every:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(posts, fmt='jsonl', compress=False, chunk_size=CHUNK_SIZE):
+    """Итератор байтов выгрузки постов в формате fmt."""
+    chunks = serialize(export_rows(posts, chunk_size), fmt)
+    return gzip_stream(chunks) if compress else chunks
@@ -0,0 +1,235 @@
+"""Рекомендации «На кого подписаться» по графу подписок в памяти.
+
+Граф строится из Follow в компактные списки смежности в формате CSR:
+соседи вершины лежат подряд в одном array, а offsets хранит начало
+каждого списка. Исходящие рёбра (на кого подписан) и входящие (кто
+подписан) хранятся отдельно. Подписки и отписки не перестраивают
+массивы: сигналы накладывают поверх них добавленные и удалённые рёбра,
+другие процессы узнают об изменениях через шину инвалидации и
+перечитывают подписки одного пользователя. Граф перестраивается целиком
+раз в FOLLOW_GRAPH_TTL или когда заплаток больше FOLLOW_GRAPH_MAX_PATCHES.
+
+Кандидаты считаются обходом с ограничением FOLLOW_GRAPH_FANOUT на каждом
+шаге: авторы, на которых подписаны мои авторы, и авторы, на которых
+подписаны другие подписчики моих авторов. Результат кешируется для
+каждого пользователя.
+"""
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import chain, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from core import invalidation
+from .models import Follow
+
+User = get_user_model()
+
+# Вес пути через моего автора и через соседа по подпискам.
+FRIEND_WEIGHT = 2
+CO_FOLLOW_WEIGHT = 1
+
+
+def suggestions_key(user_id):
+    return f'follow_suggestions:{user_id}'
+
+
+def graph_key(user_id):
+    return f'follow_graph:{user_id}'
+
+
+class Adjacency:
+    """Списки смежности CSR из пар (вершина, сосед) по порядку вершин."""
+
+    def __init__(self, pairs):
+        self.index = {}
+        self.offsets = array('q')
+        self.targets = array('q')
+        previous = None
+        for source, target in pairs:
+            if source != previous:
+                self.index[source] = len(self.offsets)
+                self.offsets.append(len(self.targets))
+                previous = source
+            self.targets.append(target)
+        self.offsets.append(len(self.targets))
+
+    def __len__(self):
+        return len(self.targets)
+
+    def bounds(self, source):
+        position = self.index.get(source)
+        if position is None:
+            return 0, 0
+        return self.offsets[position], self.offsets[position + 1]
+
+    def row(self, source):
+        start, end = self.bounds(source)
+        return self.targets[start:end]
+
+    def __contains__(self, edge):
+        source, target = edge
+        start, end = self.bounds(source)
+        # Соседи каждой вершины отсортированы, поиск двоичный.
+        position = bisect_left(self.targets, target, start, end)
+        return position < end and self.targets[position] == target
+
+
+class FollowGraph:
+    def __init__(self, pairs, reverse_pairs):
+        self.following = Adjacency(pairs)
+        self.followers = Adjacency(reverse_pairs)
+        self.added = defaultdict(set)
+        self.added_followers = defaultdict(set)
+        self.removed = set()
+        self.built = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_database(cls):
+        follows = Follow.objects.values_list('user_id', 'author_id')
+        return cls(
+            follows.order_by('user_id', 'author_id').iterator(),
+            follows.order_by('author_id', 'user_id')
+            .values_list('author_id', 'user_id').iterator(),
+        )
+
+    @property
+    def patches(self):
+        return (len(self.removed)
+                + sum(len(authors) for authors in self.added.values()))
+
+    def is_stale(self):
+        return (self.patches > settings.FOLLOW_GRAPH_MAX_PATCHES
+                or time.monotonic() - self.built > settings.FOLLOW_GRAPH_TTL)
+
+    def _following(self, user_id, limit=None):
+        authors = chain(
+            (author for author in self.following.row(user_id)
+             if (user_id, author) not in self.removed),
+            self.added.get(user_id, ()))
+        return list(islice(authors, limit))
+
+    def _followers(self, author_id, limit=None):
+        users = chain(
+            (user for user in self.followers.row(author_id)
+             if (user, author_id) not in self.removed),
+            self.added_followers.get(author_id, ()))
+        return list(islice(users, limit))
+
+    def follow(self, user_id, author_id):
+        with self.lock:
+            self.removed.discard((user_id, author_id))
+            if (user_id, author_id) not in self.following:
+                self.added[user_id].add(author_id)
+                self.added_followers[author_id].add(user_id)
+
+    def unfollow(self, user_id, author_id):
+        with self.lock:
+            self.added[user_id].discard(author_id)
+            self.added_followers[author_id].discard(user_id)
+            if (user_id, author_id) in self.following:
+                self.removed.add((user_id, author_id))
+
+    def reload_user(self, user_id):
+        """Сверяет подписки пользователя с базой и накладывает разницу."""
+        actual = set(Follow.objects.filter(user_id=user_id)
+                     .values_list('author_id', flat=True))
+        with self.lock:
+            known = set(self._following(user_id))
+        for author_id in actual - known:
+            self.follow(user_id, author_id)
+        for author_id in known - actual:
+            self.unfollow(user_id, author_id)
+
+    def suggest(self, user_id, count):
+        """id лучших кандидатов в подписки с их оценками."""
+        fanout = settings.FOLLOW_GRAPH_FANOUT
+        scores = Counter()
+        with self.lock:
+            following = set(self._following(user_id, fanout))
+            for author_id in following:
+                for candidate in self._following(author_id, fanout):
+                    scores[candidate] += FRIEND_WEIGHT
+                for neighbour in self._followers(author_id, fanout):
+                    if neighbour == user_id:
+                        continue
+                    for candidate in self._following(neighbour, fanout):
+                        scores[candidate] += CO_FOLLOW_WEIGHT
+            # Полный список подписок нужен, чтобы не советовать уже
+            # отслеживаемых авторов, даже если их больше fanout.
+            followed = set(self._following(user_id))
+        for excluded in followed | {user_id}:
+            scores.pop(excluded, None)
+        return heapq.nlargest(
+            count, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    global _graph
+    with _graph_lock:
+        if _graph is None or _graph.is_stale():
+            _graph = FollowGraph.from_database()
+        return _graph
+
+
+def reset():
+    global _graph
+    with _graph_lock:
+        _graph = None
+
+
+def follow_changed(user_id, author_id, followed):
+    """Накладывает подписку или отписку на граф этого процесса."""
+    graph = _graph
+    if graph is not None:
+        if followed:
+            graph.follow(user_id, author_id)
+        else:
+            graph.unfollow(user_id, author_id)
+    invalidation.invalidate(suggestions_key(user_id))
+    invalidation.publish(graph_key(user_id))
+
+
+def suggestions(user_id):
+    """id рекомендованных авторов из кеша или обходом графа."""
+    key = suggestions_key(user_id)
+    found = cache.get(key)
+    if found is None:
+        found = [candidate for candidate, _ in get_graph().suggest(
+            user_id, settings.FOLLOW_SUGGESTIONS)]
+        cache.set(key, found, settings.FOLLOW_SUGGESTIONS_TIMEOUT)
+    return found
+
+
+def suggested_users(user):
+    """Рекомендованные пользователю авторы в порядке оценки."""
+    if not user.is_authenticated:
+        return []
+    ids = suggestions(user.pk)
+    users = User.objects.in_bulk(ids)
+    return [users[pk] for pk in ids if pk in users]
+
+
+@invalidation.subscribe
+def _apply_invalidation(keys):
+    graph = _graph
+    if graph is None:
+        return
+    if keys is None:
+        reset()
+        return
+    prefix = graph_key('')
+    for key in keys:
+        if key.startswith(prefix):
+            graph.reload_user(int(key[len(prefix):]))
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import Textarea
+from .images import normalize_image
 from .models import Post, Comment
 
 
@@ -24,6 +26,12 @@ class PostForm(forms.ModelForm):
             },
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return normalize_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,93 @@
+"""Нормализация картинок постов при загрузке.
+
+Крупные снимки уменьшаются до POST_IMAGE_MAX_SIZE по большей стороне,
+перекодируются с качеством POST_IMAGE_QUALITY и теряют EXIF. Картинки,
+которые уже достаточно малы и не несут метаданных, сохраняются как есть.
+"""
+import base64
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps
+
+
+def max_size():
+    return getattr(settings, 'POST_IMAGE_MAX_SIZE', 1920)
+
+
+def quality():
+    return getattr(settings, 'POST_IMAGE_QUALITY', 85)
+
+
+def needs_normalization(image):
+    if getattr(image, 'is_animated', False):
+        # Кадры анимации не пережимаем, чтобы её не потерять.
+        return False
+    return max(image.size) > max_size() or 'exif' in image.info
+
+
+def downscale(image, limit):
+    """Уменьшает картинку до limit по большей стороне.
+
+    Для JPEG draft() декодирует сразу в уменьшенном масштабе, затем
+    reduce() быстро сжимает в целое число раз, а точный размер
+    получается уже из небольшой картинки.
+    """
+    if image.format == 'JPEG':
+        image.draft('RGB', (limit, limit))
+    image = ImageOps.exif_transpose(image)
+    factor = max(image.size) // limit
+    if factor >= 2:
+        image = image.reduce(factor)
+    if max(image.size) > limit:
+        image.thumbnail((limit, limit), Image.LANCZOS)
+    return image
+
+
+def normalize_image(upload):
+    """Возвращает нормализованную загрузку или исходную, если не нужно."""
+    upload.seek(0)
+    image = Image.open(upload)
+    if not needs_normalization(image):
+        upload.seek(0)
+        return upload
+    image = downscale(image, max_size())
+    buffer = BytesIO()
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image.save(buffer, 'PNG', optimize=True)
+        name, content_type = f'{stem}.png', 'image/png'
+    else:
+        image.convert('RGB').save(
+            buffer, 'JPEG', quality=quality(), optimize=True,
+            progressive=True)
+        name, content_type = f'{stem}.jpg', 'image/jpeg'
+    buffer.seek(0)
+    return InMemoryUploadedFile(
+        buffer, 'image', name, content_type, buffer.getbuffer().nbytes, None)
+
+
+def placeholder(file, width=16):
+    """Крошечная копия картинки как data URI для показа до загрузки."""
+    with Image.open(file) as image:
+        if image.format == 'JPEG':
+            image.draft('RGB', (width, width))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image.thumbnail((width, width), Image.BILINEAR)
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def post_placeholder(post):
+    if not post.image:
+        return ''
+    try:
+        with post.image.open('rb') as file:
+            return placeholder(file)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        return ''
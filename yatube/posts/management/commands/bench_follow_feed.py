@@ -0,0 +1,116 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from posts import archive
+from posts.feeds import is_sparse, scanned_posts, sources, streamed_posts
+from posts.models import Follow, Group, GroupFollow, Post
+from posts.paginator import POST_NUMBER
+from posts.projections import project
+
+User = get_user_model()
+
+
+def joined_posts(user):
+    # Прежний способ: JOIN через подписки, дубли убирает DISTINCT.
+    return Post.objects.filter(
+        Q(author__following__user=user) | Q(group__followers__user=user)
+    ).distinct()
+
+
+def stream_builder(user):
+    author_ids, group_ids = sources(user)
+    return lambda: streamed_posts(author_ids, group_ids)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает ленту подписок через JOIN, обход по дате с EXISTS '
+            'и потоки источников по индексам для плотного и редкого '
+            'читателя на синтетических данных; данные откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=2000)
+        parser.add_argument('--groups', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--spread', type=int, default=10,
+            help='Во сколько раз авторов и групп больше, чем подписок.')
+        parser.add_argument(
+            '--sparse', type=int, default=3,
+            help='На сколько авторов и групп подписан редкий читатель.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            dense, sparse = self.seed(options)
+            archive.rebuild()
+            for name, reader in (('плотный', dense), ('редкий', sparse)):
+                builders = (
+                    ('JOIN + DISTINCT', lambda: joined_posts(reader)),
+                    ('EXISTS', lambda: scanned_posts(reader)),
+                    ('потоки', stream_builder(reader)),
+                )
+                for label, build in builders:
+                    self.report(f'{name}, {label}', build, options)
+                chosen = 'потоки' if is_sparse(*sources(reader)) else 'EXISTS'
+                self.stdout.write(f'{name}: followed_posts выбирает {chosen}')
+            transaction.set_rollback(True)
+
+    def report(self, label, build, options):
+        for page in (1, 100):
+            offset = (page - 1) * POST_NUMBER
+            elapsed = self.measure(
+                lambda: list(project(build())
+                             [offset:offset + POST_NUMBER]),
+                options['repeat'])
+            self.stdout.write(f'{label}, страница {page}: {elapsed:.1f} мс')
+        elapsed = self.measure(lambda: build().count(), options['repeat'])
+        self.stdout.write(f'{label}, COUNT: {elapsed:.1f} мс')
+
+    def measure(self, run, repeat):
+        run()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    def seed(self, options):
+        random.seed(0)
+        User.objects.bulk_create(
+            (User(username=f'bench_author_{number}')
+             for number in range(options['authors'] * options['spread'])),
+            batch_size=400)
+        authors = list(User.objects.filter(
+            username__startswith='bench_author_'))
+        Group.objects.bulk_create(
+            (Group(title=f'Группа {number}', slug=f'bench-group-{number}',
+                   description='')
+             for number in range(options['groups'] * options['spread'])),
+            batch_size=400)
+        groups = list(Group.objects.filter(slug__startswith='bench-group-'))
+        Post.objects.bulk_create(
+            (Post(author=random.choice(authors),
+                  group=random.choice(groups + [None]),
+                  text='Пост')
+             for _ in range(options['posts'])))
+        dense = self.reader(
+            'bench_reader', authors[:options['authors']],
+            groups[:options['groups']])
+        sparse = self.reader(
+            'bench_sparse_reader', authors[-options['sparse']:],
+            groups[-options['sparse']:])
+        return dense, sparse
+
+    def reader(self, username, authors, groups):
+        reader = User.objects.create(username=username)
+        Follow.objects.bulk_create(
+            (Follow(user=reader, author=author) for author in authors),
+            batch_size=400)
+        GroupFollow.objects.bulk_create(
+            (GroupFollow(user=reader, group=group) for group in groups),
+            batch_size=400)
+        return reader
@@ -0,0 +1,71 @@
+import os
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageOps
+
+from posts.images import normalize_image
+
+THUMBNAIL_SIZE = (960, 339)
+
+
+def thumbnail_time(content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        with Image.open(BytesIO(content)) as image:
+            ImageOps.fit(image, THUMBNAIL_SIZE, Image.LANCZOS).save(
+                BytesIO(), 'JPEG')
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает объём и время построения миниатюры '
+            'для исходных и нормализованных картинок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def files(self, paths):
+        for path in paths:
+            if os.path.isdir(path):
+                for name in sorted(os.listdir(path)):
+                    yield os.path.join(path, name)
+            else:
+                yield path
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or [
+            os.path.join(settings.MEDIA_ROOT, 'posts')]
+        totals = [0, 0, 0.0, 0.0]
+        count = 0
+        for path in self.files(paths):
+            with open(path, 'rb') as file:
+                original = file.read()
+            try:
+                normalized = normalize_image(
+                    SimpleUploadedFile(os.path.basename(path), original))
+            except OSError:
+                continue
+            normalized.seek(0)
+            normalized = normalized.read()
+            row = (
+                len(original),
+                len(normalized),
+                thumbnail_time(original, options['repeat']),
+                thumbnail_time(normalized, options['repeat']),
+            )
+            totals = [total + value for total, value in zip(totals, row)]
+            count += 1
+            self.stdout.write(
+                f'{os.path.basename(path)}: {row[0]} -> {row[1]} байт, '
+                f'миниатюра {row[2]:.1f} -> {row[3]:.1f} мс')
+        if not count:
+            raise CommandError('Картинки не найдены.')
+        self.stdout.write(
+            f'Итого {count} картинок: {totals[0]} -> {totals[1]} байт, '
+            f'миниатюра в среднем {totals[2] / count:.1f} -> '
+            f'{totals[3] / count:.1f} мс')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.images import post_placeholder
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Считает заглушки для картинок постов, у которых их ещё нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = (Post.objects.exclude(image='').filter(placeholder='')
+                 .only('pk', 'image'))
+        done = 0
+        for post in posts.iterator(chunk_size=options['chunk_size']):
+            Post.objects.filter(pk=post.pk).update(
+                placeholder=post_placeholder(post))
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {done}.'))
@@ -0,0 +1,45 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exports import CHUNK_SIZE, FORMATS, export
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты автора или группы в JSONL или CSV потоком.'
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--author', help='username автора.')
+        source.add_argument('--group', help='slug группы.')
+        parser.add_argument('--format', choices=list(FORMATS),
+                            default='jsonl')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--output', '-o',
+                            help='Файл для выгрузки, по умолчанию stdout.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options['author']:
+            if not User.objects.filter(username=options['author']).exists():
+                raise CommandError('Автор не найден.')
+            posts = posts.filter(author__username=options['author'])
+        if options['group']:
+            if not Group.objects.filter(slug=options['group']).exists():
+                raise CommandError('Группа не найдена.')
+            posts = posts.filter(group__slug=options['group'])
+        chunks = export(posts, options['format'], options['gzip'],
+                        options['chunk_size'])
+        output = (open(options['output'], 'wb') if options['output']
+                  else sys.stdout.buffer)
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.variants import run
+
+
+class Command(BaseCommand):
+    help = 'Строит адаптивные варианты картинок для существующих постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=settings.POST_IMAGE_VARIANT_WORKERS)
+        parser.add_argument('--all', action='store_true',
+                            help='Пересоздать и уже построенные варианты.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(variants__isnull=True)
+        ids = posts.values_list('pk', flat=True).iterator()
+        with ThreadPoolExecutor(options['workers']) as pool:
+            done = sum(1 for _ in pool.map(run, ids))
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {done}.'))
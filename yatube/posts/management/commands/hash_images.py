@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.similarity import index_post
+
+
+class Command(BaseCommand):
+    help = 'Считает перцептивные хеши картинок постов, у которых их нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = (Post.objects.exclude(image='')
+                 .filter(image_hash__isnull=True).only('pk', 'image'))
+        done = 0
+        for post in posts.iterator(chunk_size=options['chunk_size']):
+            index_post(post)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {done}.'))
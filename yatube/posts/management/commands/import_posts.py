@@ -0,0 +1,254 @@
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import invalidation, storage
+from posts import archive, mentions, tags
+from posts.caching import author_posts_key
+from posts.images import normalize_image
+from posts.models import Group, Post
+from posts.signals import index_image
+
+User = get_user_model()
+
+
+def read_jsonl(stream, skip):
+    for number, line in enumerate(stream):
+        if number < skip or not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        # Битая строка идёт дальше как None и пропускается вместе
+        # с остальными негодными записями.
+        yield number, record if isinstance(record, dict) else None
+
+
+def read_csv(stream, skip):
+    for number, row in enumerate(csv.DictReader(stream)):
+        if number >= skip:
+            yield number, row
+
+
+@contextmanager
+def original_pub_dates():
+    """Позволяет сохранить дату публикации из импортируемых данных."""
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты из JSONL или CSV пачками через bulk_create. '
+            'Поля записи: author, text, pub_date, group, image.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с постами или - для stdin.')
+        parser.add_argument('--format', choices=('jsonl', 'csv'))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Потоков для копирования картинок.')
+        parser.add_argument('--image-root', default='.',
+                            help='Каталог, от которого считаются пути image.')
+        parser.add_argument('--checkpoint',
+                            help='Файл контрольной точки для продолжения.')
+        parser.add_argument('--create-missing', action='store_true',
+                            help='Создавать неизвестных авторов и группы.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv')
+                                    else 'jsonl')
+        self.options = options
+        self.checkpoint = options['checkpoint'] or (
+            None if path == '-' else path + '.checkpoint')
+        self.authors = {}
+        self.groups = {}
+        self.imported = self.skipped = 0
+        skip = self.read_checkpoint()
+        if skip:
+            self.stdout.write(f'Продолжаем с записи {skip}.')
+        stream = (sys.stdin if path == '-'
+                  else open(path, encoding='utf-8', newline=''))
+        records = (read_csv if fmt == 'csv' else read_jsonl)(stream, skip)
+        try:
+            with original_pub_dates(), \
+                    ThreadPoolExecutor(options['workers']) as pool:
+                while True:
+                    batch = list(islice(records, options['batch_size']))
+                    if not batch:
+                        break
+                    self.import_batch(batch, pool)
+                    self.write_checkpoint(batch[-1][0] + 1)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано {self.imported}, пропущено {self.skipped}.'))
+
+    def import_batch(self, batch, pool):
+        for number, record in batch:
+            if record is None:
+                self.skipped += 1
+                self.stderr.write(f'Запись {number} пропущена.')
+        batch = [(number, record) for number, record in batch
+                 if record is not None]
+        self.resolve(
+            self.authors, User, 'username',
+            {record.get('author') for _, record in batch})
+        self.resolve(
+            self.groups, Group, 'slug',
+            {record.get('group') for _, record in batch})
+        valid = []
+        for number, record in batch:
+            author = self.authors.get(record.get('author'))
+            group = self.groups.get(record.get('group') or None)
+            pub_date = self.parse_date(record.get('pub_date'))
+            if (author is None or pub_date is None or not record.get('text')
+                    or (record.get('group') and group is None)):
+                self.skipped += 1
+                self.stderr.write(f'Запись {number} пропущена.')
+                continue
+            valid.append((record, author, group, pub_date))
+        names = [record.get('image') for record, *_ in valid]
+        # Чтение и нормализация идут в потоках, а запись в хранилище,
+        # которое ведёт таблицу Blob, — в основном потоке.
+        images = [
+            self.save_image(name, upload)
+            for name, upload in zip(names, pool.map(self.load_image, names))
+        ]
+        posts = [
+            Post(
+                author_id=author,
+                group_id=group,
+                text=record['text'],
+                pub_date=pub_date,
+                image=image or '',
+            )
+            for (record, author, group, pub_date), image in zip(valid, images)
+        ]
+        with transaction.atomic():
+            Post.objects.bulk_create(posts)
+            if posts and posts[0].pk is None:
+                self.fetch_pks(posts)
+            # bulk_create не шлёт сигналов, поэтому счётчики архива, теги,
+            # упоминания и ссылки на картинки ведём сами.
+            archive.add_posts(posts)
+            tags.index_posts(posts)
+            mentions.index_posts(posts)
+            for post in posts:
+                storage.retain(post.image.name)
+        for post in posts:
+            if post.image:
+                index_image(post)
+        self.imported += len(posts)
+        invalidation.invalidate(
+            *{author_posts_key(post.author_id) for post in posts})
+        self.stdout.write(f'Импортировано {self.imported}.')
+
+    def resolve(self, cache, model, field, values):
+        """Находит id одним запросом для значений, которых нет в кеше."""
+        missing = {value for value in values if value} - set(cache)
+        if not missing:
+            return
+        cache.update(model.objects.filter(**{f'{field}__in': missing})
+                     .values_list(field, 'pk'))
+        missing -= set(cache)
+        if missing and self.options['create_missing']:
+            if model is User:
+                objects = [User(username=value) for value in missing]
+                for user in objects:
+                    user.set_unusable_password()
+            else:
+                objects = [Group(slug=value, title=value, description='')
+                           for value in missing]
+            model.objects.bulk_create(objects)
+            cache.update(model.objects.filter(**{f'{field}__in': missing})
+                         .values_list(field, 'pk'))
+
+    def fetch_pks(self, posts):
+        """Заполняет id постов, если база не вернула их из bulk_create.
+
+        Так ведёт себя SQLite; внутри транзакции она не пускает других
+        писателей, поэтому последние id по порядку принадлежат пачке.
+        """
+        pks = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True)[:len(posts)]
+        for post, pk in zip(posts, reversed(pks)):
+            post.pk = pk
+
+    def load_image(self, name):
+        """Открывает и нормализует картинку, как форма поста."""
+        if not name:
+            return None
+        source = os.path.join(self.options['image_root'], name)
+        try:
+            file = File(open(source, 'rb'), os.path.basename(name))
+        except OSError as error:
+            self.stderr.write(f'Картинка {name} не скопирована: {error}')
+            return None
+        try:
+            upload = normalize_image(file)
+        except (OSError, ValueError) as error:
+            file.close()
+            self.stderr.write(f'Картинка {name} не скопирована: {error}')
+            return None
+        if upload is not file:
+            file.close()
+        return upload
+
+    def save_image(self, name, upload):
+        """Сохраняет картинку в хранилище поля Post.image."""
+        if upload is None:
+            return None
+        field = Post._meta.get_field('image')
+        try:
+            return field.storage.save(
+                field.generate_filename(None, upload.name), upload)
+        except OSError as error:
+            self.stderr.write(f'Картинка {name} не скопирована: {error}')
+            return None
+        finally:
+            upload.close()
+
+    def parse_date(self, value):
+        if not value:
+            return timezone.now()
+        try:
+            date = parse_datetime(value)
+        except ValueError:
+            date = None
+        if date is None:
+            return None
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date, timezone.utc)
+        return date
+
+    def read_checkpoint(self):
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            with open(self.checkpoint) as file:
+                return int(file.read().strip() or 0)
+        return 0
+
+    def write_checkpoint(self, position):
+        if not self.checkpoint:
+            return
+        temporary = self.checkpoint + '.tmp'
+        with open(temporary, 'w') as file:
+            file.write(str(position))
+        os.replace(temporary, self.checkpoint)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.tags import index_posts
+
+
+class Command(BaseCommand):
+    help = ('Заполняет индекс тегов по текстам существующих постов '
+            'пачками по возрастанию id.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--start', type=int, default=0,
+                            help='Начать с постов с id больше этого.')
+
+    def handle(self, *args, **options):
+        last = options['start']
+        done = 0
+        while True:
+            posts = list(Post.objects.filter(pk__gt=last).order_by('pk')
+                         .only('pk', 'text', 'pub_date')
+                         [:options['chunk_size']])
+            if not posts:
+                break
+            index_posts(posts)
+            last = posts[-1].pk
+            done += len(posts)
+            self.stdout.write(f'Обработано {done}, последний id {last}.')
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {done}.'))
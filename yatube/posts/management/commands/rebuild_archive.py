@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.archive import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает число постов по месяцам для навигации архива.'
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Счётчиков: {count}.'))
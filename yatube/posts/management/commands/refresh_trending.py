@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import refresh
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает список популярных постов по счётчикам активности.'
+
+    def handle(self, *args, **options):
+        top = refresh()
+        self.stdout.write(
+            self.style.SUCCESS(f'Популярных постов: {len(top)}.'))
@@ -0,0 +1,71 @@
+"""Упоминания @username в постах и комментариях.
+
+Имена из текста находятся одним запросом username__in на сохранение,
+сколько бы упоминаний ни было. Найденные упоминания записываются в
+Mention, и входящие пользователя читаются по индексу (user, created)
+без поиска по текстам. При правке поста сравниваются наборы имён
+старого и нового текста, как для тегов.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+
+from .models import Mention
+
+User = get_user_model()
+
+# Символы имени пользователя Django; точка и дефис в конце — пунктуация.
+MENTION_RE = re.compile(r'(?<![\w@.+-])@([\w.@+-]*\w)')
+MAX_LENGTH = User._meta.get_field('username').max_length
+
+
+def extract(text):
+    """Множество имён, упомянутых в тексте."""
+    return {
+        name for name in MENTION_RE.findall(text or '')
+        if len(name) <= MAX_LENGTH
+    }
+
+
+def resolve(names, exclude=None):
+    """id пользователей по именам одним запросом."""
+    if not names:
+        return []
+    users = User.objects.filter(username__in=names)
+    if exclude is not None:
+        users = users.exclude(pk=exclude)
+    return list(users.values_list('pk', flat=True))
+
+
+def update_post(post, old, new):
+    """Приводит упоминания в тексте поста к именам new."""
+    added, removed = new - old, old - new
+    if removed:
+        Mention.objects.filter(
+            post=post, comment=None, user__username__in=removed).delete()
+    Mention.objects.bulk_create([
+        Mention(user_id=pk, post_id=post.pk)
+        for pk in resolve(added, exclude=post.author_id)
+    ])
+
+
+def index_posts(posts):
+    """Записывает упоминания пачки новых постов одним запросом имён."""
+    found = {post.pk: extract(post.text) for post in posts}
+    names = set().union(*found.values())
+    if not names:
+        return
+    ids = dict(User.objects.filter(username__in=names)
+               .values_list('username', 'pk'))
+    Mention.objects.bulk_create([
+        Mention(user_id=ids[name], post_id=post.pk)
+        for post in posts for name in found[post.pk]
+        if name in ids and ids[name] != post.author_id
+    ])
+
+
+def add_comment(comment):
+    Mention.objects.bulk_create([
+        Mention(user_id=pk, post_id=comment.post_id, comment=comment)
+        for pk in resolve(extract(comment.text), exclude=comment.author_id)
+    ])
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_auto_20230305_1203'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('format', models.CharField(max_length=10, verbose_name='Формат')),
+                ('image', models.ImageField(upload_to='posts/variants/', verbose_name='Картинка')),
+                ('source', models.CharField(max_length=100, verbose_name='Исходная картинка')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Вариант картинки',
+                'verbose_name_plural': 'Варианты картинок',
+                'ordering': ['format', 'width'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='imagevariant',
+            constraint=models.UniqueConstraint(fields=('post', 'format', 'width'), name='unique_image_variant'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_auto_20261019_0607'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Крошечная копия картинки в виде data URI', verbose_name='Заглушка картинки'),
+        ),
+    ]
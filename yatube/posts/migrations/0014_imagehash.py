@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_auto_20261019_0610'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageHash',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part0', models.PositiveIntegerField(db_index=True, verbose_name='Биты 63–48')),
+                ('part1', models.PositiveIntegerField(db_index=True, verbose_name='Биты 47–32')),
+                ('part2', models.PositiveIntegerField(db_index=True, verbose_name='Биты 31–16')),
+                ('part3', models.PositiveIntegerField(db_index=True, verbose_name='Биты 15–0')),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='image_hash', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Хеш картинки',
+                'verbose_name_plural': 'Хеши картинок',
+            },
+        ),
+    ]
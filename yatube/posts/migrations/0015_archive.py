@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_imagehash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCountBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('site', 'Весь сайт'), ('group', 'Группа'), ('author', 'Автор')], max_length=10, verbose_name='Раздел')),
+                ('key', models.PositiveIntegerField(default=0, help_text='0 для всего сайта', verbose_name='id группы или автора')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='Месяц')),
+                ('count', models.IntegerField(default=0, verbose_name='Число постов')),
+            ],
+            options={
+                'verbose_name': 'Посты за месяц',
+                'verbose_name_plural': 'Посты по месяцам',
+                'ordering': ['-year', '-month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pub_date'], name='post_date'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date'], name='post_group_date'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='post_author_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='postcountbucket',
+            constraint=models.UniqueConstraint(fields=('scope', 'key', 'year', 'month'), name='unique_post_count_bucket'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Mention',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата упоминания')),
+                ('comment', models.ForeignKey(blank=True, help_text='Пусто, если упоминание в тексте поста', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.Comment', verbose_name='Комментарий')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to=settings.AUTH_USER_MODEL, verbose_name='Упомянутый пользователь')),
+            ],
+            options={
+                'verbose_name': 'Упоминание',
+                'verbose_name_plural': 'Упоминания',
+                'ordering': ['-created', '-pk'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='mention',
+            index=models.Index(fields=['user', 'created'], name='mention_inbox'),
+        ),
+    ]
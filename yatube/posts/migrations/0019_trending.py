@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_mention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(unique=True, verbose_name='Место')),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trending', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Популярный пост',
+                'verbose_name_plural': 'Популярные посты',
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ActivityBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Начало часа')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Активность за час',
+                'verbose_name_plural': 'Активность по часам',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='activitybucket',
+            index=models.Index(fields=['hour'], name='activity_hour'),
+        ),
+        migrations.AddConstraint(
+            model_name='activitybucket',
+            constraint=models.UniqueConstraint(fields=('post', 'hour'), name='unique_activity_bucket'),
+        ),
+    ]
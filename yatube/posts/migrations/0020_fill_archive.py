@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def fill_archive(apps, schema_editor):
+    """Строит счётчики архива по уже существующим постам.
+
+    Повторяет posts.archive.rebuild() на исторических моделях: таблица
+    из 0015 создаётся пустой, а сигналы учитывают только новые посты.
+    """
+    Post = apps.get_model('posts', 'Post')
+    PostCountBucket = apps.get_model('posts', 'PostCountBucket')
+    posts = Post.objects.annotate(
+        year=ExtractYear('pub_date'), month=ExtractMonth('pub_date'))
+    buckets = []
+    for scope, field in (('site', None), ('author', 'author_id'),
+                         ('group', 'group_id')):
+        rows = posts.order_by()
+        if field:
+            rows = rows.exclude(**{field: None})
+        columns = [field] if field else []
+        for row in rows.values(*columns, 'year', 'month').annotate(
+                count=Count('id')):
+            buckets.append(PostCountBucket(
+                scope=scope, key=row[field] if field else 0,
+                year=row['year'], month=row['month'], count=row['count']))
+    PostCountBucket.objects.all().delete()
+    PostCountBucket.objects.bulk_create(buckets)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_trending'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_archive, migrations.RunPython.noop),
+    ]
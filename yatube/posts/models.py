@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from core.storage import ContentAddressedStorage
+
 TEXT_ELEMENTS = 15
 User = get_user_model()
 
@@ -66,6 +68,29 @@ class Follow(models.Model):
         ]
 
 
+class GroupFollow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_follows',
+        verbose_name='Подписчик',
+    )
+    group = models.ForeignKey(
+        'Group',
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='Группа',
+    )
+
+    class Meta:
+        verbose_name = 'Подписка на группу'
+        verbose_name_plural = 'Подписки на группы'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'group'],
+            name='unique_group_subscription')
+        ]
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -90,8 +115,15 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False,
+        help_text='Крошечная копия картинки в виде data URI'
+    )
 
     def __str__(self):
         return self.text[:TEXT_ELEMENTS]
@@ -100,3 +132,194 @@ class Post(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_date'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_date'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_date'),
+        ]
+
+
+class ImageVariant(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='variants',
+        verbose_name='Пост',
+    )
+    width = models.PositiveIntegerField('Ширина')
+    format = models.CharField('Формат', max_length=10)
+    image = models.ImageField('Картинка', upload_to='posts/variants/')
+    source = models.CharField('Исходная картинка', max_length=100)
+
+    class Meta:
+        ordering = ['format', 'width']
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+        constraints = [models.UniqueConstraint(
+            fields=['post', 'format', 'width'],
+            name='unique_image_variant')
+        ]
+
+
+class ImageHash(models.Model):
+    """Перцептивный хеш картинки поста, разбитый на индексируемые части."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_hash',
+        verbose_name='Пост',
+    )
+    part0 = models.PositiveIntegerField('Биты 63–48', db_index=True)
+    part1 = models.PositiveIntegerField('Биты 47–32', db_index=True)
+    part2 = models.PositiveIntegerField('Биты 31–16', db_index=True)
+    part3 = models.PositiveIntegerField('Биты 15–0', db_index=True)
+
+    class Meta:
+        verbose_name = 'Хеш картинки'
+        verbose_name_plural = 'Хеши картинок'
+
+
+class PostCountBucket(models.Model):
+    """Число постов за месяц на сайте, в группе или у автора."""
+    SITE = 'site'
+    GROUP = 'group'
+    AUTHOR = 'author'
+    SCOPES = (
+        (SITE, 'Весь сайт'),
+        (GROUP, 'Группа'),
+        (AUTHOR, 'Автор'),
+    )
+
+    scope = models.CharField('Раздел', max_length=10, choices=SCOPES)
+    key = models.PositiveIntegerField(
+        'id группы или автора', default=0,
+        help_text='0 для всего сайта')
+    year = models.PositiveSmallIntegerField('Год')
+    month = models.PositiveSmallIntegerField('Месяц')
+    count = models.IntegerField('Число постов', default=0)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        verbose_name = 'Посты за месяц'
+        verbose_name_plural = 'Посты по месяцам'
+        constraints = [models.UniqueConstraint(
+            fields=['scope', 'key', 'year', 'month'],
+            name='unique_post_count_bucket')
+        ]
+
+
+class Tag(models.Model):
+    name = models.CharField('Название', max_length=50, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """Тег поста с копией даты публикации для ленты тега по индексу."""
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Тег',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Тег поста'
+        verbose_name_plural = 'Теги постов'
+        constraints = [models.UniqueConstraint(
+            fields=['tag', 'post'],
+            name='unique_post_tag')
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'pub_date', 'post'],
+                         name='post_tag_date'),
+        ]
+
+
+class Mention(models.Model):
+    """Упоминание @username в посте или комментарии."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Упомянутый пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Пост',
+    )
+    comment = models.ForeignKey(
+        Comment,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Комментарий',
+        help_text='Пусто, если упоминание в тексте поста'
+    )
+    created = models.DateTimeField('Дата упоминания', auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created', '-pk']
+        verbose_name = 'Упоминание'
+        verbose_name_plural = 'Упоминания'
+        indexes = [
+            models.Index(fields=['user', 'created'], name='mention_inbox'),
+        ]
+
+
+class ActivityBucket(models.Model):
+    """Число комментариев к посту за час для рейтинга популярного."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='activity',
+        verbose_name='Пост',
+    )
+    hour = models.DateTimeField('Начало часа')
+    count = models.PositiveIntegerField('Комментариев', default=0)
+
+    class Meta:
+        verbose_name = 'Активность за час'
+        verbose_name_plural = 'Активность по часам'
+        constraints = [models.UniqueConstraint(
+            fields=['post', 'hour'],
+            name='unique_activity_bucket')
+        ]
+        indexes = [
+            models.Index(fields=['hour'], name='activity_hour'),
+        ]
+
+
+class TrendingPost(models.Model):
+    """Место поста в последнем расчёте популярного."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='trending',
+        verbose_name='Пост',
+    )
+    rank = models.PositiveIntegerField('Место', unique=True)
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ['rank']
+        verbose_name = 'Популярный пост'
+        verbose_name_plural = 'Популярные посты'
@@ -1,11 +1,138 @@
-from django.core.paginator import Paginator
+"""Пагинация лент.
+
+FeedPaginator не выводит ссылку на каждую страницу: у страницы есть окно
+window из соседних номеров, первых и последних страниц с многоточиями
+между ними, поэтому размер навигации не зависит от длины ленты. Точный
+COUNT(*) выполняется только для небольших выборок; для больших число
+записей берётся из кеша и пересчитывается раз в FEED_COUNT_TIMEOUT.
 
+KeysetPage листает ленту по курсору «дата публикации и id последнего
+поста» вместо номера страницы: следующая страница начинается условием по
+индексу, а не OFFSET, и стоит одинаково на любой глубине.
+"""
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 POST_NUMBER = 10
+ELLIPSIS = '…'
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def count_key(queryset):
+    query = str(queryset.query).encode()
+    return f'feed_count:{hashlib.md5(query).hexdigest()}'
+
 
+class FeedPaginator(Paginator):
+    ELLIPSIS = ELLIPSIS
+    on_each_side = 2
+    on_ends = 1
 
-def pagination(request, posts):
-    paginator = Paginator(posts, POST_NUMBER)
+    @cached_property
+    def count(self):
+        limit = settings.FEED_EXACT_COUNT_LIMIT
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        # COUNT по срезу останавливается на limit + 1 строках.
+        count = self.object_list[:limit + 1].count()
+        if count <= limit:
+            return count
+        key = count_key(self.object_list)
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, settings.FEED_COUNT_TIMEOUT)
+        return count
+
+    def page_window(self, number):
+        """Номера страниц вокруг number и по краям, с многоточиями."""
+        last = self.num_pages
+        window = range(max(number - self.on_each_side, 1),
+                       min(number + self.on_each_side, last) + 1)
+        head = range(1, min(self.on_ends, last) + 1)
+        tail = range(max(last - self.on_ends + 1, 1), last + 1)
+        pages = sorted(set(head) | set(window) | set(tail))
+        result = []
+        for page in pages:
+            if result and page - result[-1] > 1:
+                result.append(ELLIPSIS)
+            result.append(page)
+        return result
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        page.window = self.page_window(page.number)
+        return page
+
+
+def pagination(request, posts, count=None):
+    """Страница posts по ?page=; известный count избавляет от COUNT(*)."""
+    paginator = FeedPaginator(posts, POST_NUMBER)
+    if count is not None:
+        paginator.count = count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def encode_cursor(pub_date, pk):
+    micros = (pub_date - EPOCH) // datetime.timedelta(microseconds=1)
+    return f'{micros}-{pk}'
+
+
+def decode_cursor(cursor):
+    """(дата, id) из курсора или None, если курсор испорчен."""
+    try:
+        micros, pk = map(int, cursor.split('-'))
+        return EPOCH + datetime.timedelta(microseconds=micros), pk
+    except (AttributeError, OverflowError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """Страница ленты по курсору: записи и курсор следующей страницы."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+def keyset_page(queryset, cursor, date_field, pk_field,
+                per_page=POST_NUMBER):
+    """Строки queryset после курсора от новых к старым.
+
+    Порядок (date_field, pk_field) должен обслуживаться индексом.
+    """
+    rows = queryset.order_by(f'-{date_field}', f'-{pk_field}')
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        pub_date, pk = position
+        rows = rows.filter(
+            Q(**{f'{date_field}__lt': pub_date})
+            | Q(**{date_field: pub_date, f'{pk_field}__lt': pk}))
+    rows = list(rows[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[date_field], last[pk_field])
+    return KeysetPage(rows, next_cursor)
@@ -0,0 +1,43 @@
+"""Шапка профиля одним запросом.
+
+Автор, число его постов, подписчиков и подписок и то, подписан ли на
+него зритель, выбираются одним запросом к auth_user с коррелированными
+подзапросами по индексам (author, pub_date) постов и подписок. Стоимость
+шапки не зависит от числа постов и подписчиков.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import (BooleanField, Count, Exists, IntegerField,
+                              OuterRef, Subquery, Value)
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
+
+from .models import Follow, Post
+
+User = get_user_model()
+
+
+def count_of(queryset, field):
+    """COUNT(*) строк queryset, связанных с автором через field."""
+    counts = (queryset.order_by().values(field)
+              .annotate(count=Count('pk')).values('count'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def profile_header(username, viewer):
+    """Автор с post_count, follower_count, following_count и is_following
+    или 404."""
+    if viewer.is_authenticated:
+        is_following = Exists(Follow.objects.filter(
+            user_id=viewer.pk, author=OuterRef('pk')))
+    else:
+        is_following = Value(False, output_field=BooleanField())
+    authors = User.objects.annotate(
+        post_count=count_of(
+            Post.objects.filter(author=OuterRef('pk')), 'author'),
+        follower_count=count_of(
+            Follow.objects.filter(author=OuterRef('pk')), 'author'),
+        following_count=count_of(
+            Follow.objects.filter(user=OuterRef('pk')), 'user'),
+        is_following=is_following,
+    )
+    return get_object_or_404(authors, username=username)
@@ -0,0 +1,167 @@
+"""Лёгкие записи только для чтения для вывода лент.
+
+Ленты выбирают нужные колонки через values() и складывают их в компактные
+объекты со __slots__ вместо полноценных экземпляров Post, User и Group.
+Записи повторяют интерфейс моделей, который используют шаблоны.
+"""
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import ImageFieldFile
+
+from .models import ImageVariant, Post
+from .paginator import keyset_page, pagination
+
+FEED_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'image',
+    'placeholder',
+    'author_id',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group_id',
+    'group__title',
+    'group__slug',
+)
+
+IMAGE_FIELD = Post._meta.get_field('image')
+
+
+class AuthorRecord:
+    __slots__ = ('id', 'username', 'first_name', 'last_name')
+
+    def __init__(self, id, username, first_name, last_name):
+        self.id = id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+    def __str__(self):
+        return self.username
+
+
+class GroupRecord:
+    __slots__ = ('id', 'title', 'slug')
+
+    def __init__(self, id, title, slug):
+        self.id = id
+        self.title = title
+        self.slug = slug
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.title
+
+
+class PostRecord:
+    __slots__ = ('id', 'text', 'pub_date', 'image_name', 'placeholder',
+                 'author', 'group', 'variant_list')
+
+    def __init__(self, id, text, pub_date, image_name, placeholder, author,
+                 group):
+        self.id = id
+        self.text = text
+        self.pub_date = pub_date
+        self.image_name = image_name
+        self.placeholder = placeholder
+        self.author = author
+        self.group = group
+        self.variant_list = []
+
+    @classmethod
+    def from_row(cls, row):
+        group = None
+        if row['group_id'] is not None:
+            group = GroupRecord(
+                row['group_id'], row['group__title'], row['group__slug'])
+        return cls(
+            row['id'],
+            row['text'],
+            row['pub_date'],
+            row['image'],
+            row['placeholder'],
+            AuthorRecord(
+                row['author_id'],
+                row['author__username'],
+                row['author__first_name'],
+                row['author__last_name'],
+            ),
+            group,
+        )
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def image(self):
+        return ImageFieldFile(None, IMAGE_FIELD, self.image_name)
+
+    def __eq__(self, other):
+        if isinstance(other, PostRecord):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return str(self.text)[:15]
+
+
+def project(posts):
+    """Queryset ленты, выбирающий только колонки для шаблонов."""
+    return posts.values(*FEED_FIELDS)
+
+
+def attach_variants(records):
+    """Подгружает варианты картинок всех записей одним запросом."""
+    by_id = {record.id: record for record in records if record.image_name}
+    if not by_id:
+        return
+    variants = ImageVariant.objects.filter(post_id__in=by_id).values_list(
+        'post_id', 'format', 'width', 'image')
+    for post_id, fmt, width, name in variants:
+        by_id[post_id].variant_list.append(
+            (fmt, width, default_storage.url(name)))
+
+
+def to_records(rows):
+    records = [PostRecord.from_row(row) for row in rows]
+    attach_variants(records)
+    return records
+
+
+def feed_page(request, posts, count=None):
+    """Страница ленты из лёгких записей вместо экземпляров моделей."""
+    page_obj = pagination(request, project(posts), count)
+    page_obj.object_list = to_records(page_obj.object_list)
+    return page_obj
+
+
+def keyset_feed_page(request, index, date_field, pk_field):
+    """Страница ленты по курсору ?after= из индексной таблицы index.
+
+    Курсор листает узкую таблицу по её индексу, а записи для шаблонов
+    выбираются по id постов страницы.
+    """
+    page_obj = keyset_page(
+        index.values(date_field, pk_field), request.GET.get('after'),
+        date_field, pk_field)
+    ids = [row[pk_field] for row in page_obj]
+    rows = {row['id']: row
+            for row in project(Post.objects.filter(pk__in=ids))}
+    page_obj.object_list = to_records(
+        [rows[pk] for pk in ids if pk in rows])
+    return page_obj
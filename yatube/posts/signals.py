@@ -0,0 +1,227 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from core import invalidation, storage
+from .caching import (author_posts_key, forget_author, forget_group,
+                      group_key, post_key, user_key)
+from . import (archive, follow_graph, mentions, similarity, tags, trending,
+               variants)
+from .images import post_placeholder
+from .models import Comment, Follow, Group, Post, PostCountBucket
+
+User = get_user_model()
+
+INVALIDATION_CHUNK = 500
+
+
+def index_image(post):
+    """Заглушка, перцептивный хеш и варианты новой картинки поста."""
+    post.placeholder = post_placeholder(post)
+    Post.objects.filter(pk=post.pk).update(placeholder=post.placeholder)
+    similarity.index_post(post)
+    variants.schedule(post.pk)
+
+
+def invalidate_posts(posts):
+    keys = []
+    for pk in posts.values_list('pk', flat=True).iterator():
+        keys.append(post_key(pk))
+        if len(keys) == INVALIDATION_CHUNK:
+            invalidation.invalidate(*keys)
+            keys = []
+    invalidation.invalidate(*keys)
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    # Без обращения к полям: у отложенных image и group_id это был бы
+    # запрос на каждую строку выборки.
+    image = instance.__dict__.get('image')
+    instance._saved_image = getattr(image, 'name', image)
+    instance._saved_group_id = instance.__dict__.get('group_id')
+    instance._saved_text = instance.__dict__.get('text')
+
+
+@receiver(pre_save, sender=Post)
+def remember_deferred_image(sender, instance, raw=False, **kwargs):
+    """Старая картинка, если поле загрузили или задали после выборки."""
+    if (not raw and instance._saved_image is None and instance.pk
+            and 'image' in instance.__dict__):
+        instance._saved_image = Post.objects.filter(
+            pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def text_changed(sender, instance, created, raw=False, **kwargs):
+    """Обновляет теги и упоминания по разнице старого и нового текста."""
+    if raw or 'text' not in instance.__dict__:
+        return
+    if created:
+        old_tags, old_names = set(), set()
+    elif instance._saved_text is not None:
+        # Прежний текст загружен вместе с постом, запросы не нужны.
+        old_tags = tags.extract(instance._saved_text)
+        old_names = mentions.extract(instance._saved_text)
+    else:
+        old_tags = tags.saved_tags(instance)
+        old_names = set(instance.mentions.filter(comment=None)
+                        .values_list('user__username', flat=True))
+    tags.update_post(instance, old_tags, tags.extract(instance.text))
+    mentions.update_post(
+        instance, old_names, mentions.extract(instance.text))
+    instance._saved_text = instance.text
+
+
+@receiver(post_save, sender=Comment)
+def comment_mentions(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        mentions.add_comment(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_activity(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        trending.record(instance.post_id, instance.created)
+        trending.schedule()
+
+
+@receiver(post_save, sender=Post)
+def archive_counted(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        archive.add_posts([instance])
+    elif ('group_id' in instance.__dict__
+            and instance.group_id != instance._saved_group_id):
+        archive.move_post(instance, instance._saved_group_id)
+    instance._saved_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_delete, sender=Post)
+def archive_uncounted(sender, instance, **kwargs):
+    archive.add_posts([instance], sign=-1)
+
+
+@receiver(post_save, sender=Post)
+def image_changed(sender, instance, created, **kwargs):
+    old = '' if created else instance._saved_image
+    if old is None:
+        # Картинку не загружали и не меняли.
+        return
+    new = instance.image.name
+    if new != old:
+        instance._saved_image = new
+        storage.release(old)
+        storage.retain(new)
+        index_image(instance)
+
+
+@receiver(post_delete, sender=Post)
+def image_released(sender, instance, **kwargs):
+    storage.release(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    invalidation.invalidate(
+        post_key(instance.pk), author_posts_key(instance.author_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    invalidation.invalidate(post_key(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        follow_graph.follow_changed(
+            instance.user_id, instance.author_id, followed=True)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_removed(sender, instance, **kwargs):
+    follow_graph.follow_changed(
+        instance.user_id, instance.author_id, followed=False)
+
+
+GROUP_DISPLAY_FIELDS = ('slug', 'title')
+USER_DISPLAY_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def saved_values(instance, fields):
+    """Значения полей в базе до сохранения или None для нового объекта."""
+    if instance.pk is None:
+        return None
+    return (type(instance)._default_manager.filter(pk=instance.pk)
+            .values_list(*fields).first())
+
+
+def display_changed(instance, old, fields):
+    return old is not None and old != tuple(
+        getattr(instance, field) for field in fields)
+
+
+@receiver(pre_save, sender=Group)
+def remember_group(sender, instance, **kwargs):
+    instance._saved_display = saved_values(instance, GROUP_DISPLAY_FIELDS)
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    old = instance.__dict__.pop('_saved_display', None)
+    forget_group(instance)
+    # При смене slug другие узлы должны забыть и запись под старым.
+    invalidation.publish(
+        group_key(instance.slug), old and group_key(old[0]))
+    if display_changed(instance, old, GROUP_DISPLAY_FIELDS):
+        # Закешированные посты группы содержат её название и slug.
+        invalidate_posts(instance.posts.all())
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    forget_group(instance)
+    invalidation.publish(group_key(instance.slug))
+    invalidate_posts(instance.posts.all())
+
+
+@receiver(post_delete, sender=Group)
+def group_archive_removed(sender, instance, **kwargs):
+    PostCountBucket.objects.filter(
+        scope=archive.GROUP, key=instance.pk).delete()
+
+
+def only_last_login(update_fields):
+    # Вход пользователя не меняет ничего, что показывают страницы.
+    return bool(update_fields) and set(update_fields) == {'last_login'}
+
+
+@receiver(pre_save, sender=User)
+def remember_user(sender, instance, update_fields=None, **kwargs):
+    if not only_last_login(update_fields):
+        instance._saved_display = saved_values(instance, USER_DISPLAY_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if only_last_login(update_fields):
+        return
+    old = instance.__dict__.pop('_saved_display', None)
+    forget_author(instance)
+    invalidation.publish(
+        user_key(instance.username), old and user_key(old[0]))
+    if display_changed(instance, old, USER_DISPLAY_FIELDS):
+        # В закешированных постах автора есть его username и имя.
+        invalidate_posts(instance.posts.all())
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    forget_author(instance)
+    invalidation.publish(user_key(instance.username))
+    invalidate_posts(instance.posts.all())
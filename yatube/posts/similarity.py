@@ -0,0 +1,127 @@
+"""Поиск похожих картинок постов по перцептивному хешу.
+
+Для картинки считается 64-битный dHash: она сжимается до 9x8 в оттенках
+серого, и каждый бит говорит, светлее ли пиксель своего соседа справа.
+У слегка изменённых копий (пережатых, уменьшенных, подкрашенных) хеши
+отличаются лишь в нескольких битах.
+
+Хеш хранится в ImageHash четырьмя 16-битными частями с индексами. Если
+хеши отличаются не более чем в k битах, хотя бы одна из частей отличается
+не более чем в k // 4 битах, поэтому кандидаты выбираются по индексам
+среди близких значений частей, а точное расстояние считается только
+для них, а не для всех картинок.
+"""
+from itertools import combinations
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from .models import ImageHash
+
+PARTS = 4
+PART_BITS = 16
+PART_FIELDS = [f'part{index}' for index in range(PARTS)]
+# При радиусе 3 на часть соседей уже почти 700, дальше поиск не ведём.
+MAX_DISTANCE = PARTS * 3 - 1
+
+# Отправляется из post_create, если у нового поста нашлись похожие
+# картинки: matches — список (id поста, расстояние).
+near_duplicates_found = Signal(providing_args=['post', 'matches'])
+
+
+def default_distance():
+    return getattr(settings, 'POST_IMAGE_SIMILARITY_DISTANCE', 6)
+
+
+def dhash(file):
+    with Image.open(file) as image:
+        if image.format == 'JPEG':
+            image.draft('L', (9, 8))
+        image = ImageOps.exif_transpose(image).convert('L')
+        pixels = list(image.resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            value = value << 1 | (left > pixels[row * 9 + column + 1])
+    return value
+
+
+def split(value):
+    mask = (1 << PART_BITS) - 1
+    return [(value >> PART_BITS * (PARTS - 1 - index)) & mask
+            for index in range(PARTS)]
+
+
+def join(parts):
+    value = 0
+    for part in parts:
+        value = value << PART_BITS | part
+    return value
+
+
+def distance(first, second):
+    return bin(first ^ second).count('1')
+
+
+def neighbours(part, radius):
+    """Все значения части, отличающиеся от part не более чем radius битами."""
+    values = [part]
+    for bits in range(1, radius + 1):
+        for positions in combinations(range(PART_BITS), bits):
+            flipped = part
+            for position in positions:
+                flipped ^= 1 << position
+            values.append(flipped)
+    return values
+
+
+def find_similar(value, max_distance=None, exclude=None):
+    """Посты с картинками не дальше max_distance бит от хеша value.
+
+    Возвращает список (id поста, расстояние), ближайшие первыми.
+    """
+    if max_distance is None:
+        max_distance = default_distance()
+    max_distance = max(0, min(max_distance, MAX_DISTANCE))
+    radius = max_distance // PARTS
+    condition = Q()
+    for field, part in zip(PART_FIELDS, split(value)):
+        condition |= Q(**{f'{field}__in': neighbours(part, radius)})
+    hashes = ImageHash.objects.filter(condition)
+    if exclude is not None:
+        hashes = hashes.exclude(post_id=exclude)
+    matches = []
+    for post_id, *parts in hashes.values_list('post_id', *PART_FIELDS):
+        bits = distance(value, join(parts))
+        if bits <= max_distance:
+            matches.append((post_id, bits))
+    return sorted(matches, key=lambda match: (match[1], match[0]))
+
+
+def index_post(post):
+    """Считает и сохраняет хеш картинки поста, возвращает его или None."""
+    value = None
+    if post.image:
+        try:
+            with post.image.open('rb') as file:
+                value = dhash(file)
+        except (OSError, ValueError, SuspiciousFileOperation):
+            pass
+    if value is None:
+        ImageHash.objects.filter(post_id=post.pk).delete()
+        return None
+    ImageHash.objects.update_or_create(
+        post_id=post.pk, defaults=dict(zip(PART_FIELDS, split(value))))
+    return value
+
+
+def similar_posts(post, max_distance=None):
+    parts = (ImageHash.objects.filter(post_id=post.pk)
+             .values_list(*PART_FIELDS).first())
+    if parts is None:
+        return []
+    return find_similar(join(parts), max_distance, exclude=post.pk)
@@ -0,0 +1,69 @@
+"""Хештеги постов.
+
+Теги #слово выделяются из текста при сохранении поста и приводятся к
+нижнему регистру. Связи PostTag хранят копию даты публикации, поэтому
+лента тега читается по индексу (tag, pub_date, post) без поиска по
+тексту постов. При правке поста сравниваются наборы тегов старого и
+нового текста, и в базе меняются только добавленные и удалённые связи.
+"""
+import re
+
+from django.db import transaction
+
+from .models import PostTag, Tag
+
+TAG_RE = re.compile(r'(?<![\w#&])#(\w+)')
+MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+
+def normalize(name):
+    return name.casefold()
+
+
+def extract(text):
+    """Множество нормализованных тегов из текста."""
+    # Длина проверяется после casefold(): он может удлинить имя (ß → ss).
+    names = {normalize(name) for name in TAG_RE.findall(text or '')}
+    return {name for name in names if len(name) <= MAX_LENGTH}
+
+
+def tag_ids(names):
+    """id тегов по названиям; недостающие теги создаются."""
+    if not names:
+        return {}
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+
+
+def update_post(post, old, new):
+    """Приводит связи поста к тегам new, зная, что в базе теги old."""
+    added, removed = new - old, old - new
+    if not added and not removed:
+        return
+    with transaction.atomic():
+        if removed:
+            PostTag.objects.filter(
+                post=post, tag__name__in=removed).delete()
+        if added:
+            PostTag.objects.bulk_create(
+                [PostTag(tag_id=pk, post_id=post.pk, pub_date=post.pub_date)
+                 for pk in tag_ids(added).values()],
+                ignore_conflicts=True)
+
+
+def saved_tags(post):
+    return set(Tag.objects.filter(post_tags__post=post)
+               .values_list('name', flat=True))
+
+
+def index_posts(posts):
+    """Пересобирает теги пачки постов, например при заполнении индекса."""
+    found = {post.pk: extract(post.text) for post in posts}
+    with transaction.atomic():
+        PostTag.objects.filter(post_id__in=found).delete()
+        ids = tag_ids(set().union(*found.values()))
+        PostTag.objects.bulk_create([
+            PostTag(tag_id=ids[name], post_id=post.pk, pub_date=post.pub_date)
+            for post in posts for name in found[post.pk]
+        ])
@@ -0,0 +1,19 @@
+from django import template
+
+from posts.variants import srcsets
+
+register = template.Library()
+
+SIZES = '(max-width: 960px) 100vw, 960px'
+
+
+@register.inclusion_tag('includes/picture.html')
+def post_picture(post):
+    """Картинка поста в <picture> с вариантами по ширине и формату."""
+    variants = getattr(post, 'variant_list', None)
+    if variants is None:
+        variants = [
+            (variant.format, variant.width, variant.image.url)
+            for variant in post.variants.all()
+        ] if post.image else []
+    return {'post': post, 'sources': srcsets(variants), 'sizes': SIZES}
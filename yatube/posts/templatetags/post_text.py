@@ -0,0 +1,28 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import escape, format_html
+from django.utils.safestring import mark_safe
+
+from posts.tags import MAX_LENGTH, TAG_RE, normalize
+
+register = template.Library()
+
+
+@register.filter
+def hashtags(text):
+    """Текст поста со ссылками на ленты его тегов."""
+    text = str(text)
+    parts = []
+    position = 0
+    for match in TAG_RE.finditer(text):
+        name = match.group(1)
+        if len(name) > MAX_LENGTH:
+            continue
+        parts.append(escape(text[position:match.start()]))
+        parts.append(format_html(
+            '<a href="{}">{}</a>',
+            reverse('posts:tag_list', args=[normalize(name)]),
+            match.group(0)))
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return mark_safe(''.join(parts))
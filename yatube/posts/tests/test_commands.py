@@ -0,0 +1,175 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Blob
+from posts.models import Group, ImageHash, Mention, Post, PostTag
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='old_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'posts.jsonl')
+        records = [
+            {'author': 'old_author', 'text': 'Первый',
+             'pub_date': '2015-03-01T10:00:00+00:00', 'group': 'test-slug'},
+            {'author': 'unknown', 'text': 'Без автора'},
+            {'author': 'old_author', 'text': 'Второй',
+             'pub_date': '2016-03-01T10:00:00'},
+        ]
+        with open(self.path, 'w') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def run_import(self, *args):
+        call_command('import_posts', self.path, '--batch-size=2', *args,
+                     stdout=StringIO(), stderr=StringIO())
+
+    def test_import_keeps_dates_and_skips_unknown_authors(self):
+        """Импорт сохраняет даты публикации и пропускает чужие записи."""
+        self.run_import()
+        posts = Post.objects.order_by('pub_date')
+        self.assertEqual([post.text for post in posts], ['Первый', 'Второй'])
+        self.assertEqual(
+            posts[0].pub_date, datetime(2015, 3, 1, 10, tzinfo=timezone.utc))
+        self.assertEqual(posts[0].group, self.group)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Повторный запуск продолжает с контрольной точки."""
+        self.run_import()
+        self.run_import()
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_create_missing_authors(self):
+        self.run_import('--create-missing')
+        self.assertTrue(
+            Post.objects.filter(author__username='unknown').exists())
+
+    def test_malformed_lines_are_skipped(self):
+        """Битая строка и запись не-объект не прерывают импорт."""
+        with open(self.path, 'a') as file:
+            file.write('{"author": "old_author", "text": \n')
+            file.write('["old_author", "Список"]\n')
+            file.write(json.dumps({'author': 'old_author',
+                                   'text': 'Третий'}) + '\n')
+        stderr = StringIO()
+        call_command('import_posts', self.path, stdout=StringIO(),
+                     stderr=stderr)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertIn('Запись 3 пропущена.', stderr.getvalue())
+        self.assertIn('Запись 4 пропущена.', stderr.getvalue())
+
+    def test_import_indexes_like_saved_posts(self):
+        """Картинки, теги и упоминания импорта учитываются как у формы."""
+        with open(os.path.join(self.directory, 'small.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        with open(self.path, 'w') as file:
+            file.write(json.dumps({
+                'author': 'old_author', 'image': 'small.gif',
+                'text': '#импорт для @reader'}) + '\n')
+        User.objects.create_user(username='reader')
+        with override_settings(MEDIA_ROOT=self.directory):
+            self.run_import('--image-root', self.directory)
+            post = Post.objects.get()
+            self.assertEqual(
+                Blob.objects.get(name=post.image.name).refcount, 1)
+            self.assertTrue(post.placeholder)
+            self.assertTrue(ImageHash.objects.filter(post=post).exists())
+        self.assertEqual(
+            list(PostTag.objects.values_list('post', 'tag__name')),
+            [(post.pk, 'импорт')])
+        self.assertEqual(
+            list(Mention.objects.values_list('post', 'user__username')),
+            [(post.pk, 'reader')])
+
+
+class ExportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='exporter')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='export-slug',
+            description='Тестовое описание',
+        )
+        for i in range(3):
+            Post.objects.create(
+                author=cls.user, text=f'Пост {i}', group=cls.group)
+
+    def test_profile_export_streams_jsonl(self):
+        """Выгрузка профиля отдаёт по строке JSON на пост."""
+        response = self.client.get(
+            reverse('posts:profile_export', kwargs={'username': 'exporter'}))
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['author'], 'exporter')
+
+    def test_group_export_csv_gzip(self):
+        """Выгрузка группы в CSV сжимается на лету."""
+        response = self.client.get(
+            reverse('posts:group_export', kwargs={'slug': 'export-slug'}),
+            {'format': 'csv', 'gzip': '1'})
+        content = gzip.decompress(b''.join(response.streaming_content))
+        rows = list(csv.reader(StringIO(content.decode())))
+        self.assertEqual(rows[0][:3], ['id', 'pub_date', 'author'])
+        self.assertEqual(len(rows), 4)
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+
+    def test_export_command(self):
+        out = StringIO()
+        path = os.path.join(tempfile.mkdtemp(), 'posts.jsonl')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        call_command('export_posts', '--group=export-slug', '-o', path,
+                     stdout=out)
+        with open(path) as file:
+            self.assertEqual(len(file.readlines()), 3)
+
+
+class IndexTagsTests(TestCase):
+    def test_backfill(self):
+        """Команда заполняет теги постов, сохранённых без сигналов."""
+        author = User.objects.create(username='backfill')
+        Post.objects.bulk_create(
+            [Post(author=author, text=f'#импорт {number} #пачка')
+             for number in range(5)])
+        self.assertFalse(PostTag.objects.exists())
+        call_command('index_tags', '--chunk-size=2', stdout=StringIO())
+        self.assertEqual(PostTag.objects.filter(tag__name='импорт').count(), 5)
+        self.assertEqual(PostTag.objects.count(), 10)
+        call_command('index_tags', stdout=StringIO())
+        self.assertEqual(PostTag.objects.count(), 10)
@@ -1,10 +1,12 @@
 import shutil
 import tempfile
+from io import BytesIO
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from PIL import Image
 from posts.models import Comment, Post, Group
 
 
@@ -154,9 +156,9 @@ class ImageTests(TestCase):
         new_post = Post.objects.get(
             text=form_data['text'],
             author_id=self.user.id,
-            image='posts/small.gif'
         )
-        self.assertEqual('posts/small.gif', new_post.image.name)
+        self.assertRegex(
+            new_post.image.name, r'^posts/\w\w/\w\w/[0-9a-f]{64}\.gif$')
 
 
 class CommentsTests(TestCase):
@@ -208,3 +210,42 @@ class CommentsTests(TestCase):
         comments = response.context.get("comments")
         self.assertEquals(comments.count(), count + 1)
         self.assertEquals(comments[0], new_comment)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_SIZE=400)
+class ImageNormalizationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(user=self.user)
+
+    def test_large_photo_is_downscaled_and_stripped(self):
+        """Крупное фото уменьшается, перекодируется и теряет EXIF."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 1200), 'red').save(
+            buffer, 'JPEG', exif=exif)
+        uploaded = SimpleUploadedFile(
+            name='photo.jpeg',
+            content=buffer.getvalue(),
+            content_type='image/jpeg'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'post with photo', 'image': uploaded},
+        )
+        post = Post.objects.get(text='post with photo')
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (400, 300))
+            self.assertNotIn('exif', image.info)
@@ -55,3 +55,21 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+    def test_deferred_image_is_not_loaded_per_row(self):
+        """Выборка без картинки не догружает её для каждого поста."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}') for i in range(20))
+        with self.assertNumQueries(1):
+            posts = list(Post.objects.only('pk', 'text', 'pub_date'))
+        self.assertEqual(len(posts), 21)
+
+    def test_save_with_deferred_image_keeps_it(self):
+        """Сохранение без загруженной картинки её не трогает."""
+        Post.objects.filter(pk=self.post.pk).update(image='posts/kept.gif')
+        post = Post.objects.only('pk', 'text', 'author').get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save(update_fields=['text'])
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).image.name, 'posts/kept.gif')
+        self.assertNotIn('image', post.__dict__)
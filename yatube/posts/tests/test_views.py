@@ -1,5 +1,6 @@
 import shutil
 import tempfile
+from io import BytesIO
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
@@ -8,11 +9,25 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from django import forms
+from datetime import datetime, timedelta
 from time import sleep
 
 from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from posts.models import Post, Group, Follow
+from core.models import Invalidation, Task
+from posts import (archive, caching, follow_graph, mentions, similarity,
+                   tags, trending)
+from posts.models import (ActivityBucket, Post, Group, Follow, GroupFollow,
+                          Mention, PostCountBucket, PostTag, TrendingPost)
+from posts.paginator import ELLIPSIS, FeedPaginator
+from posts.profiles import profile_header
+from posts.projections import PostRecord
+from posts.variants import generate_variants
+from PIL import Image
 
 User = get_user_model()
 
@@ -88,7 +103,7 @@ class PostPagesTests(TestCase):
         response = self.guest_client.get(reverse('posts:index'))
         self.assertEqual(len(response.context['page_obj']), 10)
         post = response.context['page_obj'][0]
-        self.assertEqual(self.posts[-1], post)
+        self.assertEqual(self.posts[-1].pk, post.pk)
 
     def test_group_list_show_context_correct(self):
         """Шаблон group_list сформирован с правильным контекстом."""
@@ -103,7 +118,7 @@ class PostPagesTests(TestCase):
             reverse('posts:profile', kwargs={'username': self.post.author}))
         self.assertEqual(len(response.context['page_obj']), 10)
         post = response.context['page_obj'][0]
-        self.assertEqual(self.posts[-1], post)
+        self.assertEqual(self.posts[-1].pk, post.pk)
 
     def test_post_detail_show_correct_context(self):
         response = self.guest_client.get(
@@ -159,7 +174,7 @@ class PostPagesTests(TestCase):
             with self.subTest(value=url):
                 response = self.authorized_client.get(url)
                 page_obj = response.context.get('page_obj')
-                self.assertIn(expected, page_obj)
+                self.assertIn(expected.pk, [item.pk for item in page_obj])
 
     def test_create_post_with_group(self):
         """Проверка, что пост попал в группу, для которой был предназначен."""
@@ -174,18 +189,22 @@ class PostPagesTests(TestCase):
         cache.clear()
         address = reverse('posts:index')
         response = self.guest_client.get(address)
-        self.assertIn(post, response.context.get('page_obj'))
+        self.assertIn(
+            post.pk, [item.pk for item in response.context.get('page_obj')])
         response = self.guest_client.get(
             reverse('posts:group_list', kwargs={'slug': group.slug}))
-        self.assertIn(post, response.context.get('page_obj'))
+        self.assertIn(
+            post.pk, [item.pk for item in response.context.get('page_obj')])
         response = self.guest_client.get(
             reverse('posts:profile', kwargs={'username': post.author.username})
         )
-        self.assertIn(post, response.context.get('page_obj'))
+        self.assertIn(
+            post.pk, [item.pk for item in response.context.get('page_obj')])
         response = self.guest_client.get(
             reverse('posts:group_list',
                     kwargs={'slug': PostPagesTests.group.slug}))
-        self.assertNotIn(post, response.context.get('page_obj'))
+        self.assertNotIn(
+            post.pk, [item.pk for item in response.context.get('page_obj')])
 
     def test_check_cache(self):
         """Проверка кеша.при удалении записи из базы, она остаётся в
@@ -242,7 +261,7 @@ class ImageTests(TestCase):
         self.assert_post_image(image_path, post)
 
     def assert_post_image(self, image_path, post):
-        self.assertEquals(image_path, post.image.name[:len("posts/small")])
+        self.assertEquals(image_path, post.image.name)
 
     def test_image_is_in_context(self):
         """При выводе поста с картинкой изображение передаётся в словаре
@@ -268,7 +287,7 @@ context"""
         )
         new_post.save()
 
-        image_path = "posts/small"
+        image_path = new_post.image.name
         response = self.guest_client.get(reverse(
             'posts:post_detail', kwargs={"post_id": new_post.id}))
         context = response.context
@@ -339,7 +358,767 @@ class FollowersTests(TestCase):
         url = reverse('posts:follow_index')
         response = self.user2_client.get(url)
         page_obj = response.context.get('page_obj')
-        self.assertEqual(post1, page_obj[0])
+        self.assertEqual(post1.pk, page_obj[0].pk)
         response = self.user3_client.get(url)
         page_obj = response.context.get('page_obj')
         self.assertEqual(0, len(page_obj))
+
+
+class GroupFollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='followed', description='')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_follow_unfollow_group(self):
+        """Пользователь может подписаться на группу и отписаться от неё."""
+        url = reverse('posts:group_follow', args=[self.group.slug])
+        response = self.client.get(url)
+        self.assertRedirects(
+            response, reverse('posts:group_list', args=[self.group.slug]))
+        self.assertTrue(GroupFollow.objects.filter(
+            user=self.reader, group=self.group).exists())
+        response = self.client.get(
+            reverse('posts:group_list', args=[self.group.slug]))
+        self.assertTrue(response.context['following'])
+        self.client.get(
+            reverse('posts:group_unfollow', args=[self.group.slug]))
+        self.assertFalse(GroupFollow.objects.filter(
+            user=self.reader, group=self.group).exists())
+
+    def test_group_posts_in_follow_index(self):
+        """Посты группы попадают в ленту подписчика, даже если на автора
+        он не подписан."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='В группе')
+        Post.objects.create(author=self.author, text='Без группы')
+        GroupFollow.objects.create(user=self.reader, group=self.group)
+        self.assertEqual(self.feed(), [post.pk])
+
+    def test_post_from_both_sources_shown_once(self):
+        """Пост подписанного автора в подписанной группе виден один раз."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Дважды')
+        Follow.objects.create(user=self.reader, author=self.author)
+        GroupFollow.objects.create(user=self.reader, group=self.group)
+        self.assertEqual(self.feed(), [post.pk])
+        with override_settings(FEED_SPARSE_POSTS=0):
+            self.assertEqual(self.feed(), [post.pk])
+
+    def test_sparse_feed_reads_source_indexes(self):
+        """Редкие подписки читаются по индексам источников, а не обходом
+        всех постов; без подписок посты не запрашиваются."""
+        Post.objects.create(author=self.author, text='Пост')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.feed(), [])
+        self.assertFalse(any('FROM "posts_post"' in q['sql']
+                             for q in queries.captured_queries))
+        Follow.objects.create(user=self.reader, author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.feed()), 1)
+        self.assertTrue(any('"posts_post"."author_id" IN' in q['sql']
+                            for q in queries.captured_queries))
+        self.assertFalse(any('EXISTS' in q['sql']
+                             for q in queries.captured_queries))
+
+
+class LookupCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cached')
+        cls.group = Group.objects.create(
+            title='Кешируемая группа',
+            slug='cached-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        caching.groups.clear()
+        caching.authors.clear()
+
+    def test_group_and_profile_lookups_are_cached(self):
+        """Повторные запросы группы и профиля не ищут их в базе."""
+        group_url = reverse('posts:group_list', kwargs={'slug': 'cached-slug'})
+        profile_url = reverse(
+            'posts:profile_archive', kwargs={'username': 'cached'})
+        self.guest_client.get(group_url)
+        self.guest_client.get(profile_url)
+        group_hits = caching.groups.stats()['hits']
+        author_hits = caching.authors.stats()['hits']
+        with CaptureQueriesContext(connection) as first:
+            self.guest_client.get(group_url)
+            self.guest_client.get(profile_url)
+        self.assertFalse(any(
+            '"posts_group"."slug" =' in q['sql']
+            or '"auth_user"."username" =' in q['sql']
+            for q in first.captured_queries
+        ))
+        self.assertEqual(caching.groups.stats()['hits'], group_hits + 1)
+        self.assertEqual(caching.authors.stats()['hits'], author_hits + 1)
+
+    def test_group_save_invalidates_lookup(self):
+        """Изменение группы сбрасывает её из кеша."""
+        caching.get_group('cached-slug')
+        self.group.slug = 'renamed-slug'
+        self.group.save()
+        with self.assertRaises(Http404):
+            caching.get_group('cached-slug')
+        self.assertEqual(
+            caching.get_group('renamed-slug').title, 'Кешируемая группа')
+
+    @override_settings(INVALIDATION_BUS_ENABLED=True)
+    def test_rename_publishes_old_and_new_keys(self):
+        """Другие узлы узнают о переименовании и по старому ключу."""
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'renamed'
+        user.save()
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed-slug'
+        group.save()
+        published = set(Invalidation.objects.values_list('keys', flat=True))
+        self.assertLessEqual(
+            {caching.user_key('cached'), caching.user_key('renamed'),
+             caching.group_key('cached-slug'),
+             caching.group_key('renamed-slug')},
+            {key for keys in published for key in keys.split('\n')})
+
+    def test_save_without_display_changes_keeps_cached_posts(self):
+        """Сохранение без смены имени не сбрасывает посты автора."""
+        user = User.objects.get(pk=self.user.pk)
+        post = Post.objects.create(author=user, text='Пост')
+        cache.set(caching.post_key(post.pk), 'cached')
+        user.set_password('new-password')
+        user.save()
+        self.assertEqual(cache.get(caching.post_key(post.pk)), 'cached')
+        user.first_name = 'Новое имя'
+        user.save()
+        self.assertIsNone(cache.get(caching.post_key(post.pk)))
+
+    def test_missing_author_is_404(self):
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, 404)
+
+
+class PostDetailCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='viral')
+        cls.group = Group.objects.create(
+            title='Популярная группа',
+            slug='viral-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Вирусный пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id})
+
+    def test_post_detail_served_from_cache(self):
+        """Повторный просмотр поста не загружает пост из базы."""
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertFalse(any(
+            'FROM "posts_post"' in q['sql'] and 'COUNT' not in q['sql']
+            for q in queries.captured_queries
+        ))
+        self.assertEqual(response.context['post'].group, self.group)
+        self.assertEqual(response.context['comment_count'], 0)
+
+    def test_cached_post_holds_no_private_user_data(self):
+        """В общий кеш не попадают пароль и почта автора."""
+        self.client.get(self.url)
+        bundle = cache.get(caching.post_key(self.post.pk))
+        self.assertNotIn(self.user.password, repr(bundle))
+        self.assertFalse(any(
+            isinstance(value, User) for value in bundle['row'].values()))
+
+    def test_comment_and_edit_invalidate_cached_post(self):
+        """Комментарий и редактирование сбрасывают кеш поста."""
+        self.client.get(self.url)
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Комментарий'})
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['comment_count'], 1)
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Новый текст', 'group': self.group.id})
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['post'].text, 'Новый текст')
+
+    def test_group_change_invalidates_cached_post(self):
+        """Изменение группы сбрасывает кеш её постов."""
+        self.client.get(self.url)
+        self.group.title = 'Переименованная группа'
+        self.group.save()
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response.context['post'].group.title, 'Переименованная группа')
+
+
+class FeedProjectionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='reader', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Классика', slug='classic', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Все счастливые семьи', group=cls.group)
+
+    def test_feed_uses_records_with_model_interface(self):
+        """Лента отдаёт лёгкие записи с нужными шаблонам полями."""
+        cache.clear()
+        response = self.client.get(reverse('posts:index'))
+        record = response.context['page_obj'][0]
+        self.assertIsInstance(record, PostRecord)
+        self.assertEqual(record.pk, self.post.pk)
+        self.assertEqual(record.author.get_full_name(), 'Лев Толстой')
+        self.assertEqual(record.group.slug, 'classic')
+        self.assertContains(response, 'Лев Толстой')
+        self.assertContains(
+            response, reverse('posts:group_list', kwargs={'slug': 'classic'}))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   POST_IMAGE_VARIANT_FORMATS=('jpeg',))
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='artist')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_variants_rendered_as_srcset(self):
+        """Варианты картинки выводятся в <picture> через srcset."""
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'blue').save(buffer, 'JPEG')
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('wide.jpg', buffer.getvalue()),
+        )
+        post.refresh_from_db()
+        self.assertTrue(
+            post.placeholder.startswith('data:image/jpeg;base64,'))
+        generate_variants(post.pk)
+        self.assertEqual(
+            sorted(post.variants.values_list('width', flat=True)),
+            [320, 640, 960])
+        cache.clear()
+        for url in (reverse('posts:index'),
+                    reverse('posts:post_detail', args=(post.pk,))):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, '<picture>')
+                self.assertContains(response, '320w')
+                self.assertContains(response, 'type="image/jpeg"')
+                self.assertContains(response, 'loading="lazy"')
+                self.assertContains(response, post.placeholder)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class NearDuplicateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='moderator', email='moderator@example.com',
+            password='password')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    @staticmethod
+    def jpeg(image, **options):
+        buffer = BytesIO()
+        image.convert('RGB').save(buffer, 'JPEG', **options)
+        return buffer.getvalue()
+
+    def test_repost_matches_original(self):
+        """Пережатая копия находится, другая картинка — нет."""
+        fractal = Image.effect_mandelbrot(
+            (400, 300), (-2, -1.2, 1, 1.2), 100)
+        original = Post.objects.create(
+            author=self.user, text='Оригинал',
+            image=SimpleUploadedFile('original.jpg', self.jpeg(fractal)))
+        other = Post.objects.create(
+            author=self.user, text='Другая',
+            image=SimpleUploadedFile('other.jpg', self.jpeg(
+                fractal.transpose(Image.FLIP_LEFT_RIGHT))))
+        found = []
+
+        def receiver(sender, post, matches, **kwargs):
+            found.extend(post_id for post_id, _ in matches)
+
+        similarity.near_duplicates_found.connect(receiver)
+        self.addCleanup(
+            similarity.near_duplicates_found.disconnect, receiver)
+        repost = self.jpeg(fractal.resize((200, 150)), quality=40)
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Репост',
+            'image': SimpleUploadedFile('repost.jpg', repost),
+        })
+        self.assertEqual(found, [original.pk])
+        response = self.authorized_client.get(
+            reverse('admin:posts_post_similar', args=(original.pk,)))
+        self.assertEqual(
+            [post.text for post, _ in response.context['matches']],
+            ['Репост'])
+        self.assertNotIn(
+            other.pk, [post.pk for post, _ in response.context['matches']])
+
+
+class FeedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='prolific')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}') for i in range(35))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_window_is_elided(self):
+        """Навигация показывает окно страниц, а не все номера."""
+        paginator = FeedPaginator(range(10000), 10)
+        self.assertEqual(
+            paginator.page(500).window,
+            [1, ELLIPSIS, 498, 499, 500, 501, 502, ELLIPSIS, 1000])
+        self.assertEqual(paginator.page(2).window,
+                         [1, 2, 3, 4, ELLIPSIS, 1000])
+
+    @override_settings(FEED_EXACT_COUNT_LIMIT=20)
+    def test_large_feed_count_is_cached(self):
+        """Число записей большой ленты считается один раз и кешируется."""
+        self.assertEqual(FeedPaginator(Post.objects.all(), 10).count, 35)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                FeedPaginator(Post.objects.all(), 10).count, 35)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                FeedPaginator(Post.objects.all()[:5], 10).count, 5)
+
+    def test_feed_renders_window(self):
+        response = self.client.get(reverse('posts:index') + '?page=4')
+        self.assertEqual(response.context['page_obj'].window, [1, 2, 3, 4])
+        self.assertContains(response, '?page=2')
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='chronicler')
+        cls.group = Group.objects.create(
+            title='Летопись', slug='annals', description='Описание')
+
+    def setUp(self):
+        self.posts = [
+            Post.objects.create(
+                author=self.user, text=f'Запись {i}',
+                group=self.group if i < 2 else None)
+            for i in range(3)
+        ]
+
+    def counts(self):
+        return dict(PostCountBucket.objects.values_list('scope', 'count'))
+
+    def test_signals_keep_counts(self):
+        """Создание, перенос и удаление постов меняют счётчики."""
+        self.assertEqual(
+            self.counts(),
+            {archive.SITE: 3, archive.AUTHOR: 3, archive.GROUP: 2})
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.group = None
+        post.save()
+        self.posts[1].delete()
+        self.assertEqual(
+            self.counts(),
+            {archive.SITE: 2, archive.AUTHOR: 2, archive.GROUP: 0})
+
+    def test_month_pages(self):
+        """Страница месяца показывает только его посты."""
+        old = self.posts[0]
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.make_aware(datetime(2020, 3, 15)))
+        archive.rebuild()
+        pages = (
+            reverse('posts:archive', args=(2020, 3)),
+            reverse('posts:group_archive', args=('annals', 2020)),
+            reverse('posts:profile_archive', args=('chronicler', 2020, 3)),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    [old.pk])
+                years = [item['year'] for item in response.context['archive']]
+                self.assertEqual(years, [timezone.now().year, 2020])
+        response = self.client.get(reverse('posts:archive'))
+        self.assertContains(
+            response, reverse('posts:archive', args=(2020, 3)))
+        response = self.client.get(reverse('posts:archive', args=(2020, 13)))
+        self.assertEqual(response.status_code, 404)
+
+
+class TagTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='tagger')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def names(self, post):
+        return set(PostTag.objects.filter(post=post)
+                   .values_list('tag__name', flat=True))
+
+    def test_extract(self):
+        self.assertEqual(
+            tags.extract('#Django и #питон, но не a#b, &#39; и ##x'),
+            {'django', 'питон'})
+
+    def test_extract_checks_length_after_casefold(self):
+        """Тег, удлинившийся при casefold, не превышает длины поля."""
+        limit = tags.MAX_LENGTH
+        self.assertEqual(tags.extract('#' + 'ß' * limit), set())
+        self.assertEqual(
+            tags.extract('#' + 'ß' * (limit // 2)), {'ss' * (limit // 2)})
+
+    def test_tags_saved_and_diffed_on_edit(self):
+        """Теги выделяются при создании и обновляются при правке поста."""
+        self.client.post(reverse('posts:post_create'),
+                         {'text': 'Про #Django и #python'})
+        post = Post.objects.get()
+        self.assertEqual(self.names(post), {'django', 'python'})
+        kept = PostTag.objects.get(post=post, tag__name='django').pk
+        self.client.post(reverse('posts:post_edit', args=[post.pk]),
+                         {'text': 'Про #django и #sql'})
+        self.assertEqual(self.names(post), {'django', 'sql'})
+        # Неизменный тег не пересоздаётся.
+        self.assertTrue(PostTag.objects.filter(pk=kept).exists())
+
+    def test_tag_feed_keyset_pages(self):
+        """Лента тега листается курсором без повторов и пропусков."""
+        for number in range(13):
+            Post.objects.create(author=self.user, text=f'#лента {number}')
+        Post.objects.create(author=self.user, text='без тега')
+        url = reverse('posts:tag_list', args=['лента'])
+        response = self.client.get(url)
+        first = list(response.context['page_obj'])
+        self.assertEqual(len(first), 10)
+        self.assertTrue(response.context['page_obj'].has_next())
+        cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(url, {'after': cursor})
+        second = list(response.context['page_obj'])
+        self.assertEqual(len(second), 3)
+        self.assertFalse(response.context['page_obj'].has_next())
+        expected = list(Post.objects.filter(text__startswith='#лента')
+                        .order_by('-pub_date', '-pk'))
+        self.assertEqual([post.pk for post in first + second],
+                         [post.pk for post in expected])
+
+    def test_tag_links_and_canonical_url(self):
+        Post.objects.create(author=self.user, text='Смотри #Новости')
+        url = reverse('posts:tag_list', args=['новости'])
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'href="{url}"')
+        response = self.client.get(
+            reverse('posts:tag_list', args=['Новости']))
+        self.assertRedirects(response, url, status_code=301)
+        response = self.client.get(
+            reverse('posts:tag_list', args=['нет-такого']))
+        self.assertEqual(response.status_code, 404)
+
+
+class MentionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='speaker')
+        cls.alice = User.objects.create(username='alice')
+        cls.bob = User.objects.create(username='bob.smith')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def mentioned(self, post):
+        return set(post.mentions.filter(comment=None)
+                   .values_list('user__username', flat=True))
+
+    def test_extract(self):
+        self.assertEqual(
+            mentions.extract('@alice, @bob.smith. и mail@alice.ru'),
+            {'alice', 'bob.smith'})
+
+    def test_names_resolved_in_one_query(self):
+        with self.assertNumQueries(1):
+            found = mentions.resolve({'alice', 'bob.smith', 'ghost'})
+        self.assertCountEqual(found, [self.alice.pk, self.bob.pk])
+
+    def test_post_mentions_diffed_on_edit(self):
+        """Упоминания сохраняются из поста и обновляются при правке."""
+        self.client.post(reverse('posts:post_create'),
+                         {'text': 'Привет, @alice и @ghost и @speaker'})
+        post = Post.objects.get()
+        self.assertEqual(self.mentioned(post), {'alice'})
+        kept = Mention.objects.get(post=post).pk
+        self.client.post(reverse('posts:post_edit', args=[post.pk]),
+                         {'text': '@alice, @bob.smith'})
+        self.assertEqual(self.mentioned(post), {'alice', 'bob.smith'})
+        self.assertTrue(Mention.objects.filter(pk=kept).exists())
+        self.client.post(reverse('posts:post_edit', args=[post.pk]),
+                         {'text': 'Никого'})
+        self.assertEqual(self.mentioned(post), set())
+
+    def test_inbox(self):
+        """Упоминания в постах и комментариях видны во входящих."""
+        post = Post.objects.create(author=self.author, text='@alice')
+        self.client.post(reverse('posts:add_comment', args=[post.pk]),
+                         {'text': 'И ты, @alice!'})
+        client = Client()
+        client.force_login(self.alice)
+        with self.assertNumQueries(4):
+            # Сессия, пользователь, COUNT и страница.
+            response = client.get(reverse('posts:mentions'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 2)
+        self.assertIsNotNone(page_obj[0].comment)
+        self.assertContains(response, 'И ты, @alice!')
+        client.force_login(self.bob)
+        response = client.get(reverse('posts:mentions'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='commenter')
+        cls.old = Post.objects.create(author=cls.user, text='Вчерашний')
+        cls.fresh = Post.objects.create(author=cls.user, text='Свежий')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_comments_counted_in_hour_buckets(self):
+        """Комментарии прибавляются к счётчику часа, пересчёт ставится
+        один раз."""
+        url = reverse('posts:add_comment', args=[self.fresh.pk])
+        self.client.post(url, {'text': 'Первый'})
+        self.client.post(url, {'text': 'Второй'})
+        bucket = ActivityBucket.objects.get()
+        self.assertEqual(bucket.count, 2)
+        self.assertEqual(bucket.hour, trending.hour_start(timezone.now()))
+        self.assertEqual(
+            Task.objects.filter(name=trending.REFRESH_TASK).count(), 1)
+
+    def test_refresh_decays_and_prunes(self):
+        now = timezone.now()
+        for _ in range(3):
+            trending.record(self.old.pk, now - timedelta(hours=30))
+        trending.record(self.fresh.pk, now)
+        trending.record(self.fresh.pk, now - timedelta(days=5))
+        top = trending.refresh(now)
+        self.assertEqual([post_id for post_id, _ in top],
+                         [self.fresh.pk, self.old.pk])
+        # Счётчик пятидневной давности вышел из окна и удалён.
+        self.assertEqual(ActivityBucket.objects.count(), 2)
+        self.assertEqual(
+            list(TrendingPost.objects.values_list('post_id', 'rank')),
+            [(self.fresh.pk, 1), (self.old.pk, 2)])
+
+    def test_trending_tab(self):
+        TrendingPost.objects.create(post=self.old, rank=1, score=2)
+        TrendingPost.objects.create(post=self.fresh, rank=2, score=1)
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.old.pk, self.fresh.pk])
+        self.assertContains(response, 'Популярное')
+
+
+class FollowSuggestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.friend, cls.peer, cls.popular, cls.niche = [
+            User.objects.create(username=name)
+            for name in ('reader', 'friend', 'peer', 'popular', 'niche')]
+
+    def setUp(self):
+        cache.clear()
+        follow_graph.reset()
+        self.addCleanup(follow_graph.reset)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow(self, user, author):
+        Follow.objects.create(user=user, author=author)
+
+    def test_adjacency(self):
+        rows = follow_graph.Adjacency([(1, 2), (1, 5), (3, 4)])
+        self.assertEqual(list(rows.row(1)), [2, 5])
+        self.assertEqual(list(rows.row(2)), [])
+        self.assertIn((1, 5), rows)
+        self.assertNotIn((1, 4), rows)
+
+    def test_friends_of_friends_and_co_follows(self):
+        """Советуются авторы моих авторов и соседей по подпискам."""
+        self.follow(self.reader, self.friend)
+        self.follow(self.friend, self.popular)
+        self.follow(self.peer, self.friend)
+        self.follow(self.peer, self.popular)
+        self.follow(self.peer, self.niche)
+        self.assertEqual(follow_graph.suggestions(self.reader.pk),
+                         [self.popular.pk, self.niche.pk])
+
+    def test_graph_patched_by_signals(self):
+        """Подписки после построения графа учитываются без перестройки."""
+        follow_graph.get_graph()
+        built = follow_graph.get_graph()
+        self.follow(self.reader, self.friend)
+        self.follow(self.friend, self.popular)
+        self.assertIs(follow_graph.get_graph(), built)
+        self.assertEqual(follow_graph.suggestions(self.reader.pk),
+                         [self.popular.pk])
+        self.follow(self.reader, self.popular)
+        self.assertEqual(follow_graph.suggestions(self.reader.pk), [])
+        Follow.objects.filter(user=self.reader, author=self.popular).delete()
+        self.assertEqual(follow_graph.suggestions(self.reader.pk),
+                         [self.popular.pk])
+
+    def test_reload_user(self):
+        """Изменения из другого процесса подтягиваются по шине."""
+        graph = follow_graph.get_graph()
+        Follow.objects.bulk_create([
+            Follow(user=self.reader, author=self.friend),
+            Follow(user=self.friend, author=self.popular)])
+        follow_graph.invalidation.apply([
+            follow_graph.graph_key(self.reader.pk),
+            follow_graph.graph_key(self.friend.pk)])
+        self.assertEqual(graph.suggest(self.reader.pk, 5),
+                         [(self.popular.pk, follow_graph.FRIEND_WEIGHT)])
+
+    def test_suggestions_shown(self):
+        self.follow(self.reader, self.friend)
+        self.follow(self.friend, self.popular)
+        for url in (reverse('posts:follow_index'),
+                    reverse('posts:profile', args=[self.friend.username])):
+            response = self.client.get(url)
+            self.assertEqual(response.context['suggestions'], [self.popular])
+            self.assertContains(response, 'На кого подписаться')
+
+
+class ProfileHeaderTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='header')
+        cls.fan = User.objects.create(username='fan')
+        cls.stranger = User.objects.create(username='stranger')
+        Follow.objects.create(user=cls.fan, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.fan)
+        Follow.objects.create(user=cls.stranger, author=cls.fan)
+        Post.objects.bulk_create(
+            [Post(author=cls.author, text=f'Пост {number}')
+             for number in range(12)])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_header_in_one_query(self):
+        with self.assertNumQueries(1):
+            author = profile_header('header', self.fan)
+        self.assertEqual(author, self.author)
+        self.assertEqual(author.post_count, 12)
+        self.assertEqual(author.follower_count, 1)
+        self.assertEqual(author.following_count, 1)
+        self.assertTrue(author.is_following)
+        self.assertFalse(profile_header('header', self.stranger).is_following)
+        empty = profile_header('stranger', self.fan)
+        self.assertEqual(
+            (empty.post_count, empty.follower_count, empty.following_count),
+            (0, 0, 1))
+
+    def test_follow_button(self):
+        """Подписчик видит кнопку отписки, остальные — подписки, автор —
+        никакой."""
+        url = reverse('posts:profile', args=['header'])
+        unfollow = reverse('posts:profile_unfollow', args=['header'])
+        follow = reverse('posts:profile_follow', args=['header'])
+        client = Client()
+        client.force_login(self.fan)
+        response = client.get(url)
+        self.assertTrue(response.context['is_following'])
+        self.assertContains(response, unfollow)
+        client.force_login(self.stranger)
+        response = client.get(url)
+        self.assertFalse(response.context['is_following'])
+        self.assertContains(response, follow)
+        response = Client().get(url)
+        self.assertFalse(response.context['is_following'])
+        self.assertEqual(response.context['post_count'], 12)
+        client.force_login(self.author)
+        response = client.get(url)
+        self.assertNotContains(response, follow)
+        self.assertNotContains(response, unfollow)
+
+    def test_header_cost_constant(self):
+        """Число запросов профиля не зависит от постов и подписчиков."""
+        Post.objects.create(author=self.stranger, text='Один пост')
+        follow_graph.reset()
+        self.addCleanup(follow_graph.reset)
+        follow_graph.get_graph()
+        client = Client()
+        client.force_login(self.fan)
+        with CaptureQueriesContext(connection) as small:
+            client.get(reverse('posts:profile', args=['stranger']))
+        cache.clear()
+        with CaptureQueriesContext(connection) as large:
+            client.get(reverse('posts:profile', args=['header']))
+        self.assertEqual(len(small), len(large))
+        # Число постов для пагинации берётся из шапки.
+        self.assertFalse(any(
+            query['sql'].startswith('SELECT COUNT(*)')
+            for query in large.captured_queries))
@@ -0,0 +1,91 @@
+"""Популярные посты по недавним комментариям.
+
+Новый комментарий прибавляет единицу к счётчику ActivityBucket своего
+поста за текущий час, поэтому запросы не агрегируют комментарии. Фоновая
+задача refresh_trending читает только счётчики из окна
+TRENDING_WINDOW_HOURS, удаляет вышедшие из окна, взвешивает каждый час с
+затуханием вдвое за TRENDING_HALF_LIFE_HOURS и кучей отбирает
+TRENDING_SIZE лучших постов в TrendingPost. Вкладка «Популярное» читает
+готовый список.
+"""
+import heapq
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Task
+from core.tasks import task
+from .models import ActivityBucket, TrendingPost
+
+
+def hour_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record(post_id, moment=None):
+    """Учитывает одно действие с постом в счётчике текущего часа."""
+    hour = hour_start(moment or timezone.now())
+    buckets = ActivityBucket.objects.filter(post_id=post_id, hour=hour)
+    if buckets.update(count=F('count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            ActivityBucket.objects.create(post_id=post_id, hour=hour, count=1)
+    except IntegrityError:
+        buckets.update(count=F('count') + 1)
+
+
+def scores(now=None):
+    """Оценки постов по счётчикам окна с затуханием по возрасту."""
+    now = now or timezone.now()
+    half_life = timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+    start = hour_start(now) - timedelta(
+        hours=settings.TRENDING_WINDOW_HOURS - 1)
+    result = Counter()
+    buckets = ActivityBucket.objects.filter(hour__gte=start).values_list(
+        'post_id', 'hour', 'count')
+    for post_id, hour, count in buckets.iterator():
+        age = max(now - hour - timedelta(hours=1), timedelta(0))
+        result[post_id] += count * 0.5 ** (age / half_life)
+    return result
+
+
+def refresh(now=None):
+    """Пересчитывает список популярного и удаляет устаревшие счётчики."""
+    now = now or timezone.now()
+    top = heapq.nlargest(
+        settings.TRENDING_SIZE, scores(now).items(),
+        key=lambda item: (item[1], item[0]))
+    with transaction.atomic():
+        ActivityBucket.objects.filter(hour__lt=hour_start(now) - timedelta(
+            hours=settings.TRENDING_WINDOW_HOURS - 1)).delete()
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create([
+            TrendingPost(post_id=post_id, rank=rank, score=score)
+            for rank, (post_id, score) in enumerate(top, 1)
+        ])
+    return top
+
+
+@task
+def refresh_trending():
+    refresh()
+
+
+REFRESH_TASK = (
+    f'{refresh_trending.__module__}.{refresh_trending.__qualname__}')
+
+
+def schedule():
+    """Ставит пересчёт через TRENDING_REFRESH_INTERVAL, если он не стоит.
+
+    Пока на сайте комментируют, список обновляется не чаще интервала,
+    а без активности задачи не ставятся.
+    """
+    if not Task.objects.filter(name=REFRESH_TASK,
+                               status=Task.QUEUED).exists():
+        refresh_trending.delay(countdown=settings.TRENDING_REFRESH_INTERVAL)
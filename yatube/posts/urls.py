@@ -4,14 +4,41 @@ from . import views
 app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
+    path('trending/', views.trending, name='trending'),
+    path('archive/', views.site_archive, name='archive'),
+    path('archive/<int:year>/', views.site_archive, name='archive'),
+    path('archive/<int:year>/<int:month>/',
+         views.site_archive, name='archive'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/export/',
+         views.group_export, name='group_export'),
+    path('group/<slug:slug>/follow/',
+         views.group_follow, name='group_follow'),
+    path('group/<slug:slug>/unfollow/',
+         views.group_unfollow, name='group_unfollow'),
+    path('group/<slug:slug>/archive/',
+         views.group_archive, name='group_archive'),
+    path('group/<slug:slug>/archive/<int:year>/',
+         views.group_archive, name='group_archive'),
+    path('group/<slug:slug>/archive/<int:year>/<int:month>/',
+         views.group_archive, name='group_archive'),
+    path('tag/<str:name>/', views.tag_posts, name='tag_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/export/',
+         views.profile_export, name='profile_export'),
+    path('profile/<str:username>/archive/',
+         views.profile_archive, name='profile_archive'),
+    path('profile/<str:username>/archive/<int:year>/',
+         views.profile_archive, name='profile_archive'),
+    path('profile/<str:username>/archive/<int:year>/<int:month>/',
+         views.profile_archive, name='profile_archive'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('mentions/', views.mention_inbox, name='mentions'),
     path('profile/<str:username>/follow/',
          views.profile_follow, name='profile_follow'),
     path('profile/<str:username>/unfollow/',
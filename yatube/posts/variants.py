@@ -0,0 +1,140 @@
+"""Адаптивные варианты картинок постов для <picture> и srcset.
+
+Для каждой картинки строится набор ширин в современных форматах (AVIF и
+WebP, если их поддерживает Pillow) и в JPEG для остальных браузеров.
+Варианты считаются фоновой задачей после сохранения поста, а не в запросе.
+"""
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+
+from core import invalidation
+from core.tasks import task
+from .caching import post_key
+from .models import ImageVariant, Post
+
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+# Пропорции миниатюры 960x339, в которой картинка показывается в ленте.
+ASPECT = 339 / 960
+
+SAVE_OPTIONS = {
+    'avif': {'format': 'AVIF', 'quality': 50},
+    'webp': {'format': 'WEBP', 'quality': 75, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 80, 'optimize': True,
+             'progressive': True},
+}
+
+
+def supported_formats():
+    available = {
+        'avif': 'AVIF' in Image.SAVE,
+        'webp': features.check('webp'),
+        'jpeg': True,
+    }
+    return [fmt for fmt in settings.POST_IMAGE_VARIANT_FORMATS
+            if available.get(fmt)]
+
+
+def render_variants(image, widths, formats):
+    """Строит (формат, ширина, байты) для всех сочетаний."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info
+                              else 'RGB')
+    for width in sorted(widths):
+        if width > image.width and width != min(widths):
+            # Увеличенные копии не дают выигрыша, хватит меньших ширин.
+            continue
+        size = (width, round(width * ASPECT))
+        resized = ImageOps.fit(image, size, Image.LANCZOS)
+        for fmt in formats:
+            frame = resized
+            if fmt == 'jpeg' and frame.mode != 'RGB':
+                frame = frame.convert('RGB')
+            buffer = BytesIO()
+            frame.save(buffer, **SAVE_OPTIONS[fmt])
+            yield fmt, width, buffer.getvalue()
+
+
+@task
+def generate_variants(post_id):
+    """Пересоздаёт варианты картинки поста.
+
+    Если та же картинка уже есть у другого поста (хранилище отдаёт дублям
+    один файл), его варианты переиспользуются без пересчёта.
+    """
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    old = list(post.variants.all())
+    variants = []
+    if post.image:
+        variants = [
+            ImageVariant(post=post, width=variant.width,
+                         format=variant.format, image=variant.image.name,
+                         source=variant.source)
+            for variant in ImageVariant.objects.filter(
+                source=post.image.name).exclude(post=post)
+        ]
+    if post.image and not variants:
+        with post.image.open('rb') as file, Image.open(file) as image:
+            for fmt, width, content in render_variants(
+                    image, settings.POST_IMAGE_VARIANT_WIDTHS,
+                    supported_formats()):
+                variant = ImageVariant(
+                    post=post, width=width, format=fmt,
+                    source=post.image.name)
+                variant.image.save(
+                    f'{post.pk}-{width}.{fmt}', ContentFile(content),
+                    save=False)
+                variants.append(variant)
+    with transaction.atomic():
+        ImageVariant.objects.filter(pk__in=[v.pk for v in old]).delete()
+        ImageVariant.objects.bulk_create(variants)
+    for variant in old:
+        if not ImageVariant.objects.filter(image=variant.image.name).exists():
+            variant.image.delete(save=False)
+    invalidation.invalidate(post_key(post_id))
+
+
+def run(post_id):
+    close_old_connections()
+    try:
+        generate_variants(post_id)
+    except Exception:
+        logger.exception('Не удалось построить варианты для поста %s',
+                         post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(post_id):
+    """Ставит построение вариантов в очередь фоновых задач."""
+    generate_variants.delay(post_id=post_id)
+
+
+def srcsets(variants):
+    """Группирует варианты по формату в строки srcset для <source>."""
+    sources = {}
+    for fmt, width, url in variants:
+        sources.setdefault(fmt, []).append(f'{url} {width}w')
+    return [
+        {'type': f'image/{fmt}', 'srcset': ', '.join(sources[fmt])}
+        for fmt in supported_order(sources)
+    ]
+
+
+def supported_order(formats):
+    # Браузер берёт первый подходящий <source>, лучшие форматы идут первыми.
+    order = list(SAVE_OPTIONS)
+    return sorted(formats, key=order.index)
@@ -1,64 +1,136 @@
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth import get_user_model
 from django.views.decorators.cache import cache_page
-from .models import Post, Group, Follow
+from .models import Follow, GroupFollow, Mention, Post, Tag
 from .forms import PostForm, CommentForm
+from . import archive, similarity, tags
+from .follow_graph import suggested_users
+from .caching import (get_author, get_author_post_count, get_group,
+                      get_post_bundle)
+from .exports import FORMATS, export
+from .feeds import followed_posts
 from .paginator import pagination
-
-
-User = get_user_model()
+from .profiles import profile_header
+from .projections import feed_page, keyset_feed_page
 
 
 @cache_page(20, key_prefix='index_page')
 def index(request):
-    posts = Post.objects.select_related('author', 'group')
-    page_obj = pagination(request, posts)
+    page_obj = feed_page(request, Post.objects.all())
     context = {
+        'index': True,
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+def trending(request):
+    posts = Post.objects.filter(
+        trending__isnull=False).order_by('trending__rank')
+    context = {
+        'trending': True,
+        'page_obj': feed_page(request, posts),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    page_obj = pagination(request, posts)
+    group = get_group(slug)
+    page_obj = feed_page(request, group.posts.all())
+    following = (request.user.is_authenticated
+                 and GroupFollow.objects.filter(
+                     user=request.user, group=group).exists())
     context = {
         'group': group,
+        'following': following,
         'page_obj': page_obj,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+def tag_posts(request, name):
+    canonical = tags.normalize(name)
+    if canonical != name:
+        return redirect('posts:tag_list', canonical, permanent=True)
+    tag = get_object_or_404(Tag, name=name)
+    page_obj = keyset_feed_page(
+        request, tag.post_tags.all(), 'pub_date', 'post_id')
+    context = {
+        'tag': tag,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/tag_list.html', context)
+
+
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = author.following
-    if request.user.is_authenticated or not following.exists():
-        is_following = False
-    else:
-        is_following = following.filter(user=request.user).exists()
-    posts = author.posts.select_related('group')
-    post_count = posts.count()
-    page_obj = pagination(request, posts)
+    author = profile_header(username, request.user)
+    page_obj = feed_page(request, author.posts.all(), count=author.post_count)
     context = {
         'author': author,
-        'is_following': is_following,
+        'is_following': author.is_following,
         'page_obj': page_obj,
-        'post_count': post_count,
+        'post_count': author.post_count,
+        'suggestions': suggested_users(request.user),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def render_archive(request, posts, scope, key, url_name, url_args,
+                   year=None, month=None, context=None):
+    """Навигация по архиву и посты за выбранный год или месяц."""
+    def link(year, month=None):
+        args = [*url_args, year] + ([month] if month else [])
+        return reverse(url_name, args=args)
+
+    context = dict(context or {})
+    context['archive'] = archive.navigation(scope, key, link)
+    context['archive_url'] = reverse(url_name, args=url_args)
+    if year is not None:
+        if not 1 <= year <= 9998 or month is not None and not 1 <= month <= 12:
+            raise Http404
+        start, end = archive.period_bounds(year, month)
+        context.update({
+            'year': year,
+            'month': month,
+            'period_start': start,
+            'page_obj': feed_page(
+                request, posts.filter(pub_date__gte=start, pub_date__lt=end)),
+        })
+    return render(request, 'posts/archive.html', context)
+
+
+def site_archive(request, year=None, month=None):
+    return render_archive(
+        request, Post.objects.all(), archive.SITE, 0, 'posts:archive', [],
+        year, month)
+
+
+def group_archive(request, slug, year=None, month=None):
+    group = get_group(slug)
+    return render_archive(
+        request, group.posts.all(), archive.GROUP, group.pk,
+        'posts:group_archive', [slug], year, month, {'group': group})
+
+
+def profile_archive(request, username, year=None, month=None):
+    author = get_author(username)
+    return render_archive(
+        request, author.posts.all(), archive.AUTHOR, author.pk,
+        'posts:profile_archive', [username], year, month, {'author': author})
+
+
 def post_detail(request, post_id):
-    this_post = get_object_or_404(Post, pk=post_id)
-    posts = this_post.author.posts.all()
-    post_count = posts.count()
+    bundle = get_post_bundle(post_id)
+    this_post = bundle['post']
+    post_count = get_author_post_count(this_post.author_id)
     form = CommentForm()
-    comments = this_post.comments.all()
+    comments = this_post.comments.select_related('author')
     context = {
         'post': this_post,
         'post_count': post_count,
+        'comment_count': bundle['comment_count'],
         'form': form,
         'comments': comments
     }
@@ -72,6 +144,10 @@ def post_create(request):
         post = form.save(False)
         post.author = request.user
         post.save()
+        matches = similarity.similar_posts(post)
+        if matches:
+            similarity.near_duplicates_found.send(
+                sender=Post, post=post, matches=matches)
         return redirect('posts:profile', request.user.username)
     context = {
         'form': form
@@ -116,17 +192,28 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = pagination(request, posts)
+    page_obj = feed_page(request, followed_posts(request.user))
     context = {
+        'follow': True,
         'page_obj': page_obj,
+        'suggestions': suggested_users(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
+@login_required
+def mention_inbox(request):
+    mentions = Mention.objects.filter(user=request.user).select_related(
+        'post__author', 'comment__author')
+    context = {
+        'page_obj': pagination(request, mentions),
+    }
+    return render(request, 'posts/mentions.html', context)
+
+
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_author(username)
     if author != request.user:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:follow_index')
@@ -134,6 +221,47 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_author(username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:follow_index')
+
+
+@login_required
+def group_follow(request, slug):
+    group = get_group(slug)
+    GroupFollow.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+def group_unfollow(request, slug):
+    group = get_group(slug)
+    GroupFollow.objects.filter(user=request.user, group=group).delete()
+    return redirect('posts:group_list', slug)
+
+
+def export_response(request, posts, filename):
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки.')
+    compress = request.GET.get('gzip') == '1'
+    filename = f'{filename}.{fmt}'
+    content_type = FORMATS[fmt]
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(
+        export(posts, fmt, compress), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def profile_export(request, username):
+    author = get_author(username)
+    return export_response(
+        request, author.posts.all(), f'{author.username}-posts')
+
+
+def group_export(request, slug):
+    group = get_group(slug)
+    return export_response(request, group.posts.all(), f'{group.slug}-posts')
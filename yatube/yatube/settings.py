@@ -34,6 +34,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
@@ -75,6 +76,12 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Очередь исходящих писем (core.outbox): размер пачки на одно соединение
+# с бэкендом, предел писем в секунду (None — без предела) и число попыток.
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_RATE = None
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 # Database
@@ -92,6 +99,44 @@ CACHES = {
     }
 }
 
+# Шина инвалидации локальных кешей между узлами (core.invalidation).
+# Данные на узле устаревают не больше чем на POLL_INTERVAL, при отставании
+# больше MAX_STALENESS секунд локальный кеш очищается целиком. События
+# последних GRACE секунд перечитываются: транзакция с меньшим id могла
+# зафиксироваться позже уже прочитанной.
+# Пока шина выключена, события не записываются в core_invalidation.
+INVALIDATION_BUS_ENABLED = False
+INVALIDATION_BUS_POLL_INTERVAL = 1
+INVALIDATION_BUS_BATCH_SIZE = 500
+INVALIDATION_BUS_RETENTION = 60 * 60
+INVALIDATION_BUS_MAX_STALENESS = 30
+INVALIDATION_BUS_GRACE = 30
+
+# Кеш процесса для групп по slug и авторов по username (posts.caching).
+LOOKUP_CACHE_SIZE = 1024
+LOOKUP_CACHE_TTL = 5 * 60
+
+# Пагинация лент (posts.paginator): до скольких записей считать точно
+# и сколько секунд хранить число записей больших лент.
+FEED_EXACT_COUNT_LIMIT = 1000
+FEED_COUNT_TIMEOUT = 60
+# Лента подписок (posts.feeds): до скольких постов от подписок читать их
+# по индексам источников, а не обходом всех постов по дате.
+FEED_SPARSE_POSTS = 5000
+
+# Время жизни закешированных постов для post_detail (posts.caching).
+POST_CACHE_TIMEOUT = 15 * 60
+
+# Очередь фоновых задач (core.tasks): число процессов run_workers, пауза
+# при пустой очереди, задержка повтора упавшей задачи (удваивается с
+# каждой попыткой) и время, после которого задачу зависшего обработчика
+# можно отдать другому.
+TASK_WORKERS = 2
+TASK_POLL_INTERVAL = 1
+TASK_RETRY_DELAY = 10
+TASK_RETRY_MAX_DELAY = 60 * 60
+TASK_TIMEOUT = 10 * 60
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -130,5 +175,63 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# Без DEBUG collectstatic добавляет к именам хеши и кладёт рядом сжатые
+# копии, а core.staticfiles.serve отдаёт их с долгим кешированием.
+if not DEBUG:
+    STATICFILES_STORAGE = (
+        'core.staticfiles.CompressedManifestStaticFilesStorage')
+STATIC_CACHE_MAX_AGE = 60 * 60
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Раздача медиа (core.media). MEDIA_SENDFILE: None, 'x-sendfile' (Apache,
+# lighttpd) или 'x-accel-redirect' (nginx с internal-локацией по адресу
+# MEDIA_ACCEL_PREFIX). Файлы по шаблонам MEDIA_IMMUTABLE_PATTERNS не
+# меняются под своим именем и кешируются на год.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 60 * 60
+MEDIA_IMMUTABLE_PATTERNS = (
+    r'cache/',
+    r'posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.',
+)
+
+# Нормализация загружаемых картинок постов (posts.images).
+POST_IMAGE_MAX_SIZE = 1920
+POST_IMAGE_QUALITY = 85
+
+# Адаптивные варианты картинок (posts.variants): форматы, которых нет
+# в сборке Pillow, пропускаются.
+POST_IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+POST_IMAGE_VARIANT_FORMATS = ('avif', 'webp', 'jpeg')
+POST_IMAGE_VARIANT_WORKERS = 2
+
+# Загрузки по частям (api.uploads): куда складываются незавершённые
+# файлы, их наибольший размер и срок, после которого clear_uploads их
+# удаляет.
+UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
+UPLOAD_MAX_SIZE = 100 * 1024 * 1024
+UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Насколько (в битах перцептивного хеша) могут различаться картинки,
+# чтобы считаться похожими (posts.similarity).
+POST_IMAGE_SIMILARITY_DISTANCE = 6
+
+# Популярное (posts.trending): за сколько часов учитываются комментарии,
+# за сколько часов вес комментария падает вдвое, сколько постов в списке
+# и не чаще какого интервала в секундах он пересчитывается.
+TRENDING_WINDOW_HOURS = 48
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_SIZE = 100
+TRENDING_REFRESH_INTERVAL = 5 * 60
+
+# Рекомендации подписок (posts.follow_graph): срок жизни графа в памяти
+# в секундах, число заплаток, после которого он перестраивается, сколько
+# соседей смотреть на каждом шаге обхода, сколько авторов советовать и
+# сколько секунд хранить рекомендации пользователя.
+FOLLOW_GRAPH_TTL = 10 * 60
+FOLLOW_GRAPH_MAX_PATCHES = 10000
+FOLLOW_GRAPH_FANOUT = 100
+FOLLOW_SUGGESTIONS = 5
+FOLLOW_SUGGESTIONS_TIMEOUT = 10 * 60
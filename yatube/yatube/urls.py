@@ -1,7 +1,10 @@
+import re
+
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core import media, staticfiles
 
 
 urlpatterns = [
@@ -10,12 +13,21 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
 ]
 
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.csrf_failure'
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
+urlpatterns += [
+    re_path(
+        r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        media.serve,
+        name='media',
+    ),
+    re_path(
+        r'^%s(?P<path>.+)$' % re.escape(settings.STATIC_URL.lstrip('/')),
+        staticfiles.serve,
+        name='static',
+    ),
+]